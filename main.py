@@ -1,22 +1,219 @@
+import os
 import sys
+import time
 from argparse import ArgumentParser
-from collections import OrderedDict
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import Executor, as_completed
+from functools import lru_cache, partial
 from pathlib import Path
+from typing import NamedTuple, Optional
 
-from prefix_codes.codecs.base import BaseCodec
-from prefix_codes.codecs.shannon_fano_elias import ShannonFanoEliasCodec
-from prefix_codes.codecs.tree_based import TreeBasedCodec
-from prefix_codes.codes.huffman import create_huffman_tree
+from prefix_codes.codecs.registry import ALIASES, CODEC_NAMES, get_codec_class
+
+
+class FileResult(NamedTuple):
+    filename: Path
+    out_filename: Path
+    num_input_bytes: int
+    num_output_bytes: int
+    seconds: float
+
+    def __str__(self):
+        num_plain_bytes = max(self.num_input_bytes, self.num_output_bytes)
+        throughput = num_plain_bytes / self.seconds / 1e6 if self.seconds > 0 else float('inf')
+        return (
+            f'{self.filename} -> {self.out_filename}: '
+            f'{self.num_input_bytes} -> {self.num_output_bytes} bytes '
+            f'in {self.seconds:.3f}s ({throughput:.2f} MB/s)'
+        )
+
+
+def get_decoded_filename(filename: Path) -> Path:
+    assert filename.suffix == '.enc', 'the encoded file extension must be ".enc"'
+    return (
+        filename
+        .with_suffix('')  # remove '.enc'
+        .with_stem(f'{filename.with_suffix("").stem}_dec')  # add '_dec' to stem
+    )
+
+
+def is_output_file(file: Path) -> bool:
+    return file.suffix == '.enc' or file.stem.endswith('_dec')
+
+
+def collect_files(paths: Iterable[str], action: str, model_path: Path = None) -> list[Path]:
+    """Expands directories (recursively) and glob patterns.
+    Inside directories, only '.enc' files are decoded, and neither '.enc' nor '_dec' files
+    (the outputs of earlier runs) are encoded. The model file is never processed.
+    """
+    files: list[Path] = []
+    for path_str in paths:
+        path = Path(path_str)
+        if path.is_dir():
+            files.extend(
+                file for file in sorted(path.rglob('*'))
+                if file.is_file() and (
+                    file.suffix == '.enc' if action == 'decode' else not is_output_file(file)
+                )
+            )
+        elif path.exists():
+            files.append(path)
+        else:
+            import glob
+
+            matches = sorted(glob.glob(path_str, recursive=True))
+            if not matches:
+                raise FileNotFoundError(f'{path_str} does not match any file')
+            files.extend(Path(match) for match in matches if Path(match).is_file())
+    if model_path is not None and model_path.exists():
+        files = [file for file in files if not file.samefile(model_path)]
+    return files
+
+
+@lru_cache
+def load_shared_model(model_path: Path):
+    from prefix_codes.codecs.shared_model import SharedModelCodec
+
+    return SharedModelCodec.load(model_path)
+
+
+def count_symbols(filename: Path) -> Counter[int]:
+    with open(filename, 'rb') as file:
+        return Counter(file.read())
+
+
+def train_shared_model(files: list[Path], model_path: Path, executor: Optional[Executor]) -> None:
+    from prefix_codes.codecs.shared_model import SharedModelCodec
+
+    counts: Counter[int] = Counter()
+    for file_counts in (executor.map if executor is not None else map)(count_symbols, files):
+        counts.update(file_counts)
+    SharedModelCodec.from_counts(counts).save(model_path)
+
+
+def decode_checksummed(byte_stream: bytes, verify: bool = True) -> bytes:
+    """Decodes all blocks before raising, so that the error lists every corrupted block."""
+    from prefix_codes.codecs.checksummed import ChecksumError, ChecksummedCodec
+
+    codec_data, enc_message, message_length = ChecksummedCodec.parse_byte_stream(byte_stream)
+    codec = ChecksummedCodec.from_codec_data(codec_data, message_length, verify=verify)
+    blocks = list(codec.decode_blocks(enc_message, max_length=message_length))
+    errors = [block.error for block in blocks if block.error is not None]
+    if errors:
+        raise ChecksumError(f'{len(errors)}/{len(blocks)} blocks are corrupted: {"; ".join(map(str, errors))}')
+    return b''.join(bytes(block.symbols) for block in blocks)
+
+
+def encode_file(code: str, filename: Path, force: bool = False, model_path: Path = None,
+                checksums: bool = False, verify: bool = True) -> FileResult:
+    start = time.perf_counter()
+    out_filename: Path = filename.with_suffix(f'{filename.suffix}.enc')
+    assert force or not out_filename.exists(), f'{out_filename} already exists'
+
+    with open(filename, 'rb') as file:
+        message = file.read()
+
+    if model_path is not None:
+        codec = load_shared_model(model_path)
+        missing_symbols = set(message) - codec.table.keys()
+        if missing_symbols:
+            raise ValueError(
+                f'{filename} contains bytes that are not in the shared model {model_path}: '
+                f'{sorted(missing_symbols)} (train a new model with --retrain)'
+            )
+    else:
+        codec = get_codec_class(code).from_message(message)  # bytes is an Iterable[int]
+    if checksums:
+        from prefix_codes.codecs.checksummed import ChecksummedCodec
+
+        codec = ChecksummedCodec(codec)
+    serialization = codec.serialize(message)
+
+    with open(out_filename, 'wb') as outfile:
+        outfile.write(serialization)
+    return FileResult(filename, out_filename, len(message), len(serialization), time.perf_counter() - start)
+
+
+def decode_file(code: str, filename: Path, force: bool = False, model_path: Path = None,
+                checksums: bool = False, verify: bool = True) -> FileResult:
+    start = time.perf_counter()
+    out_filename = get_decoded_filename(filename)
+    assert force or not out_filename.exists(), f'{out_filename} already exists'
+
+    with open(filename, 'rb') as file:
+        byte_stream = file.read()
+
+    if model_path is not None:
+        decoded_message = bytes(load_shared_model(model_path).decode_serialization(byte_stream))
+    elif checksums:
+        decoded_message = decode_checksummed(byte_stream, verify)
+    else:
+        decoded_message = bytes(get_codec_class(code).decode_byte_stream(byte_stream))
+    with open(out_filename, 'wb') as outfile:
+        outfile.write(decoded_message)
+    return FileResult(filename, out_filename, len(byte_stream), len(decoded_message), time.perf_counter() - start)
+
+
+def process_files(action: str, code: str, files: list[Path], *, jobs: int = 1,
+                  force: bool = False, model_path: Path = None, train: bool = False,
+                  checksums: bool = False, verify: bool = True) -> int:
+    """Encodes or decodes `files`, printing a line per file. Returns the number of failed files."""
+    process_file = encode_file if action == 'encode' else decode_file
+    executor: Optional[Executor] = None
+    if jobs != 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=jobs or os.cpu_count())
+    num_failures = 0
+    num_plain_bytes = 0
+    start = time.perf_counter()
+    try:
+        if train:
+            train_shared_model(files, model_path, executor)
+            print(f'trained shared model {model_path}')
+
+        if executor is None:
+            results = (
+                (filename, partial(process_file, code, filename, force, model_path, checksums, verify))
+                for filename in files
+            )
+        else:
+            futures = {
+                executor.submit(process_file, code, filename, force, model_path, checksums, verify): filename
+                for filename in files
+            }
+            results = (
+                (futures[future], future.result)
+                for future in as_completed(futures)
+            )
+
+        for filename, get_result in results:
+            try:
+                result = get_result()
+            except Exception as e:
+                num_failures += 1
+                print(f'{filename}: {type(e).__name__}: {e}', file=sys.stderr)
+            else:
+                num_plain_bytes += max(result.num_input_bytes, result.num_output_bytes)
+                print(result)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    seconds = time.perf_counter() - start
+    print(
+        f'{len(files) - num_failures}/{len(files)} files, {num_plain_bytes} bytes in {seconds:.3f}s'
+        f' ({num_plain_bytes / seconds / 1e6:.2f} MB/s)'
+    )
+    return num_failures
 
 
 if __name__ == '__main__':
     parser = ArgumentParser(description='Decode or encode files')
     parser.add_argument(
         'code',
-        choices=[
-            'huffman', 'h',
-            'shannon-fano-elias', 'sfe',
-        ],
+        choices=CODEC_NAMES,
         type=str,
         help='code to use',
     )
@@ -27,61 +224,75 @@ if __name__ == '__main__':
         help='encode or decode',
     )
     parser.add_argument(
-        'filename',
+        'paths',
+        nargs='+',
+        type=str,
+        help='files, directories (processed recursively) or glob patterns (e.g. "logs/**/*.log")',
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='number of worker processes (0: one per CPU)',
+    )
+    parser.add_argument(
+        '-f', '--force',
+        action='store_true',
+        help='overwrite existing output files (but not the shared model)',
+    )
+    parser.add_argument(
+        '--shared-model',
         type=Path,
-        help='path to the file to be processed',
+        help=(
+            'Huffman model shared by all files. When encoding, a new model is trained on all files '
+            'unless the model file exists. Only for the huffman code.'
+        ),
+    )
+    parser.add_argument(
+        '--retrain',
+        action='store_true',
+        help='train a new shared model on all files even if the model file exists (overwrites it)',
+    )
+    parser.add_argument(
+        '--checksums',
+        action='store_true',
+        help=(
+            'split the message into blocks with CRC32 checksums so that corrupted blocks are detected '
+            '(also required for decoding such files)'
+        ),
+    )
+    parser.add_argument(
+        '--no-verify',
+        action='store_true',
+        help='do not verify the checksums when decoding (faster)',
     )
 
     args = parser.parse_args()
-    print(args)
-
-    filename: Path = args.filename
-
-    if args.action == 'encode':
-        with open(filename, 'rb') as file:
-            message = file.read()
-
-        codec: BaseCodec[int]  # bytes is an Iterable[int]
-        match args.code:
-            case 'huffman' | 'h':
-                codec = TreeBasedCodec.from_tree(create_huffman_tree(message))
-            case 'shannon-fano-elias' | 'sfe':
-                codec = ShannonFanoEliasCodec(OrderedDict([
-                    (ord('a'), 1 / 2),
-                    (ord('n'), 1 / 3),
-                    (ord('b'), 1 / 6),
-                ]))
-                print(codec.encode(b'banana'))
-                sys.exit(0)
-            case _:
-                raise ValueError('invalid code')
-
-        out_filename: Path = filename.with_suffix(f'{filename.suffix}.enc')
-        assert not out_filename.exists(), f'{out_filename} already exists'
-
-        with open(out_filename, 'wb') as outfile:
-            outfile.write(codec.serialize(message))
-    else:
-        assert filename.suffix == '.enc', 'the encoded file extension must be ".enc"'
-        out_filename: Path = (
-            filename
-            .with_suffix('')  # remove '.enc'
-            .with_stem(f'{filename.with_suffix("").stem}_dec')  # add '_dec' to stem
-        )
-        assert not out_filename.exists(), f'{out_filename} already exists'
-
-        with open(args.filename, 'rb') as file:
-            byte_stream = file.read()
-
-        codec: BaseCodec[int]  # bytes is an Iterable[int]
-        match args.code:
-            case 'huffman' | 'h':
-                codec = TreeBasedCodec[int]
-            case 'shannon-fano-elias' | 'sfe':
-                codec = ShannonFanoEliasCodec[int]
-            case _:
-                raise ValueError('invalid code')
-
-        decoded_message = bytes(codec.decode_byte_stream(byte_stream))
-        with open(out_filename, 'wb') as outfile:
-            outfile.write(decoded_message)
+
+    if args.shared_model is not None and ALIASES.get(args.code, args.code) != 'huffman':
+        parser.error('--shared-model requires the huffman code')
+    if args.retrain and (args.shared_model is None or args.action != 'encode'):
+        parser.error('--retrain requires --shared-model and the encode action')
+    train = (
+        args.action == 'encode'
+        and args.shared_model is not None
+        and (args.retrain or not args.shared_model.exists())
+    )
+    if args.shared_model is not None and args.checksums:
+        parser.error('--checksums cannot be combined with --shared-model')
+    if args.action == 'decode' and args.shared_model is not None and not args.shared_model.exists():
+        parser.error(f'{args.shared_model} does not exist')
+
+    files = collect_files(args.paths, args.action, args.shared_model)
+    num_failures = process_files(
+        args.action,
+        args.code,
+        files,
+        jobs=args.jobs,
+        force=args.force,
+        model_path=args.shared_model,
+        train=train,
+        checksums=args.checksums,
+        verify=not args.no_verify,
+    )
+    sys.exit(1 if num_failures else 0)
@@ -0,0 +1,142 @@
+import pickle
+from collections.abc import Hashable, Iterable
+from enum import IntEnum
+from typing import Generic, Optional, TypeVar
+
+from prefix_codes.utils import as_buffer
+
+H = TypeVar('H', bound=Hashable)
+V = TypeVar('V')
+
+MAX_FLAT_SYMBOL = 2 ** 16
+"""Integer symbols below this get flat tables indexed by symbol value"""
+UNSIGNED_FORMATS = ('B', 'H')
+"""Buffer formats whose items can index flat tables directly (8 and 16 bit)"""
+
+
+class SymbolKind(IntEnum):
+    """How the symbols of an alphabet are serialized"""
+    UINT8 = 0
+    UINT16 = 1
+    STR = 2
+    BYTES = 3
+    PICKLE = 4
+
+
+def get_symbol_kind(symbols: list) -> SymbolKind:
+    if all(type(symbol) is int for symbol in symbols):
+        if all(0 <= symbol < 2 ** 8 for symbol in symbols):
+            return SymbolKind.UINT8
+        if all(0 <= symbol < 2 ** 16 for symbol in symbols):
+            return SymbolKind.UINT16
+    elif all(type(symbol) is str for symbol in symbols):
+        return SymbolKind.STR
+    elif all(type(symbol) is bytes for symbol in symbols):
+        return SymbolKind.BYTES
+    return SymbolKind.PICKLE
+
+
+class Alphabet(Generic[H]):
+    """Maps the symbols of a message to dense integer IDs (their index in `symbols`), so that
+    codecs can store their tables in flat lists indexed by ID instead of dicts keyed by symbol.
+    Bytes, 16 bit integers (e.g. `array('H')` messages) and word tokens (`str` or `bytes`)
+    are serialized compactly; other symbols are pickled.
+    """
+
+    symbols: list[H]
+    """Symbols by ID (in the order they were given)"""
+    ids: dict[H, int]
+    id_table: Optional[list[int]]
+    """IDs indexed by symbol value (-1: not in the alphabet) if all symbols are integers in [0, 2^16)"""
+
+    def __init__(self, symbols: Iterable[H]):
+        self.symbols = list(dict.fromkeys(symbols))
+        self.ids = {
+            symbol: symbol_id
+            for symbol_id, symbol in enumerate(self.symbols)
+        }
+        if self.symbols and get_symbol_kind(self.symbols) in (SymbolKind.UINT8, SymbolKind.UINT16):
+            self.id_table = [-1] * (max(self.symbols) + 1)
+            for symbol_id, symbol in enumerate(self.symbols):
+                self.id_table[symbol] = symbol_id
+        else:
+            self.id_table = None
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def get_flat_table(self, values: list[V]) -> Optional[list[Optional[V]]]:
+        """Re-indexes `values` (indexed by ID) by symbol value, if there is an `id_table`."""
+        if self.id_table is None:
+            return None
+        return [
+            values[symbol_id] if symbol_id >= 0 else None
+            for symbol_id in self.id_table
+        ]
+
+    def to_ids(self, message: Iterable[H]) -> list[int]:
+        """Maps `message` to IDs in a single pass. 8/16 bit buffers use the flat `id_table`."""
+        buffer = as_buffer(message)
+        try:
+            if self.id_table is not None and buffer is not None and buffer.format in UNSIGNED_FORMATS:
+                id_table = self.id_table
+                ids = [id_table[symbol] for symbol in buffer]
+                if ids and min(ids) < 0:
+                    raise KeyError(-1)
+                return ids
+            ids = self.ids
+            return [ids[symbol] for symbol in message]
+        except (KeyError, IndexError, TypeError):
+            raise AssertionError('message contains symbols that are not in the alphabet') from None
+
+    def from_ids(self, ids: Iterable[int]) -> list[H]:
+        symbols = self.symbols
+        return [symbols[symbol_id] for symbol_id in ids]
+
+    def serialize(self) -> bytes:
+        kind = get_symbol_kind(self.symbols)
+        match kind:
+            case SymbolKind.UINT8:
+                data = bytes(self.symbols)
+            case SymbolKind.UINT16:
+                data = b''.join(symbol.to_bytes(2, byteorder='big') for symbol in self.symbols)
+            case SymbolKind.STR | SymbolKind.BYTES:
+                tokens = [symbol.encode() if kind == SymbolKind.STR else symbol for symbol in self.symbols]
+                assert all(len(token) < 2 ** 16 for token in tokens), 'tokens must be shorter than 2^16 bytes'
+                data = b''.join(len(token).to_bytes(2, byteorder='big') + token for token in tokens)
+            case _:
+                data = pickle.dumps(self.symbols)
+        return (
+            bytes([kind])
+            + len(self.symbols).to_bytes(4, byteorder='big')
+            + len(data).to_bytes(4, byteorder='big')
+            + data
+        )
+
+    @classmethod
+    def parse(cls, byte_stream: bytes, offset: int = 0) -> tuple['Alphabet', int]:
+        """Inverse of `serialize`. Returns the alphabet and the offset after it."""
+        kind = SymbolKind(byte_stream[offset])
+        num_symbols = int.from_bytes(byte_stream[offset + 1:offset + 5], byteorder='big')
+        num_bytes = int.from_bytes(byte_stream[offset + 5:offset + 9], byteorder='big')
+        offset += 9
+        data = byte_stream[offset:offset + num_bytes]
+        match kind:
+            case SymbolKind.UINT8:
+                symbols = list(data)
+            case SymbolKind.UINT16:
+                symbols = [
+                    int.from_bytes(data[i:i + 2], byteorder='big')
+                    for i in range(0, 2 * num_symbols, 2)
+                ]
+            case SymbolKind.STR | SymbolKind.BYTES:
+                symbols = []
+                i = 0
+                for _ in range(num_symbols):
+                    length = int.from_bytes(data[i:i + 2], byteorder='big')
+                    token = bytes(data[i + 2:i + 2 + length])
+                    symbols.append(token.decode() if kind == SymbolKind.STR else token)
+                    i += 2 + length
+            case _:
+                symbols = pickle.loads(data)
+        return cls(symbols), offset + num_bytes
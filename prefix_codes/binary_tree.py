@@ -81,7 +81,7 @@ class BinaryTree(list[Optional['BinaryTree']], Generic[T, M]):
         """Goes to the next node according to `bit` and returns it and the according character."""
         assert self[bit] is not None, f'could not consume bit {bit}'
         next_node = self[bit]
-        if next_node.terminal:
+        if next_node.terminal is not None:
             return next_node.terminal, self.root
         else:
             return None, next_node
@@ -0,0 +1,278 @@
+import pickle
+from collections.abc import Iterable, Iterator
+from typing import Optional
+
+from prefix_codes.codecs.base import BaseCodec, EncodingStats
+from prefix_codes.typedefs import Bit
+from prefix_codes.utils import get_byte, read_bits
+
+NO_NODE = -1
+
+
+class AdaptiveHuffmanTree:
+    """Compact Huffman tree for the FGK algorithm (see Knuth, "Dynamic Huffman Coding").
+
+    Nodes live in flat lists indexed by their node number.
+    Node numbers list the nodes by non-decreasing weight with siblings being adjacent
+    (sibling property), the root has the highest number.
+    The NYT ("not yet transmitted") leaf has weight 0 and precedes new symbols.
+    """
+
+    symbol_bits: int
+    max_weight: int
+    """Once the root reaches this weight, all weights are halved."""
+    weight: list[int]
+    parent: list[int]
+    left: list[int]
+    right: list[int]
+    symbol: list[int]
+    leaves: dict[int, int]
+    """Maps symbols to their leaf's node number"""
+    nyt: int
+    root: int
+
+    def __init__(self, symbol_bits: int = 8, max_weight: int = 2 ** 16):
+        self.symbol_bits = symbol_bits
+        self.max_weight = max_weight
+        size = 2 * (2 ** symbol_bits) + 1
+        self.weight = [0] * size
+        self.parent = [NO_NODE] * size
+        self.left = [NO_NODE] * size
+        self.right = [NO_NODE] * size
+        self.symbol = [NO_NODE] * size
+        self.leaves = {}
+        self.root = size - 1
+        self.nyt = self.root
+
+    def is_leaf(self, node: int) -> bool:
+        return self.left[node] == NO_NODE
+
+    def get_codeword(self, symbol: int) -> list[Bit]:
+        """Codeword of `symbol`. Unseen symbols are the NYT codeword followed by the raw symbol."""
+        node = self.leaves.get(symbol)
+        if node is None:
+            assert 0 <= symbol < 2 ** self.symbol_bits, f'symbol {symbol} does not fit into {self.symbol_bits} bits'
+            raw_bits = [(symbol >> i) & 1 for i in reversed(range(self.symbol_bits))]
+            return self.get_path(self.nyt) + raw_bits
+        return self.get_path(node)
+
+    def get_path(self, node: int) -> list[Bit]:
+        path: list[Bit] = []
+        while node != self.root:
+            parent = self.parent[node]
+            path.append(1 if self.right[parent] == node else 0)
+            node = parent
+        path.reverse()
+        return path
+
+    def decode_symbol(self, bits: Iterator[Bit]) -> Optional[int]:
+        """Reads one codeword from `bits`. Returns `None` if `bits` ends before the codeword does."""
+        node = self.root
+        while not self.is_leaf(node):
+            bit = next(bits, None)
+            if bit is None:
+                return None
+            node = self.right[node] if bit else self.left[node]
+        if node != self.nyt:
+            return self.symbol[node]
+
+        symbol = 0
+        for _ in range(self.symbol_bits):
+            bit = next(bits, None)
+            if bit is None:
+                return None
+            symbol = (symbol << 1) | bit
+        return symbol
+
+    def update(self, symbol: int) -> None:
+        node = self.leaves.get(symbol)
+        if node is None:
+            node = self.split_nyt(symbol)
+
+        while node != NO_NODE:
+            leader = self.get_block_leader(node)
+            if leader == self.parent[node] and leader - 1 != node:
+                # The sibling is the NYT leaf, so the parent has the same weight and leads the block.
+                # Moving the node out of the parent's subtree first lets it take the parent's place.
+                self.swap(node, leader - 1)
+                node = leader - 1
+            if leader != node and leader != self.parent[node]:
+                self.swap(node, leader)
+                node = leader
+            self.weight[node] += 1
+            node = self.parent[node]
+
+        if self.weight[self.root] >= self.max_weight:
+            self.rescale()
+
+    def split_nyt(self, symbol: int) -> int:
+        """Replaces the NYT leaf by an internal node with a new NYT leaf and a leaf for `symbol`."""
+        internal = self.nyt
+        nyt = internal - 2
+        leaf = internal - 1
+        assert nyt >= 0, 'alphabet is exhausted'
+        self.left[internal] = nyt
+        self.right[internal] = leaf
+        for node in (nyt, leaf):
+            self.parent[node] = internal
+            self.left[node] = self.right[node] = NO_NODE
+            self.weight[node] = 0
+        self.symbol[internal] = NO_NODE
+        self.symbol[nyt] = NO_NODE
+        self.symbol[leaf] = symbol
+        self.leaves[symbol] = leaf
+        self.nyt = nyt
+        return leaf
+
+    def get_block_leader(self, node: int) -> int:
+        """Highest numbered node with the same weight as `node`."""
+        weight = self.weight[node]
+        leader = node
+        while leader < self.root and self.weight[leader + 1] == weight:
+            leader += 1
+        return leader
+
+    def swap(self, a: int, b: int) -> None:
+        """Exchanges the subtrees at node numbers `a` and `b` (which have equal weights)."""
+        for attr in (self.left, self.right, self.symbol):
+            attr[a], attr[b] = attr[b], attr[a]
+        for node in (a, b):
+            if self.is_leaf(node):
+                self.leaves[self.symbol[node]] = node
+            else:
+                self.parent[self.left[node]] = node
+                self.parent[self.right[node]] = node
+
+    def rescale(self) -> None:
+        """Halves the leaf weights and rebuilds the tree so that the sibling property holds again.
+        Deterministic, so encoder and decoder stay in sync.
+        """
+        # leaves in order of their node number so that ties are resolved identically
+        leaves = sorted(self.leaves.items(), key=lambda item: item[1])
+        queue: list[tuple[int, int, int]] = [(0, NO_NODE, NO_NODE)]  # (weight, symbol, NO_NODE) for the NYT
+        queue.extend(
+            ((self.weight[node] + 1) // 2, symbol, NO_NODE)
+            for symbol, node in leaves
+        )
+        queue.sort(key=lambda item: item[0])
+
+        # Two-queue Huffman construction: nodes are removed in order of non-decreasing weight,
+        # numbering them in that order (siblings consecutively) yields the sibling property.
+        # Items are (weight, symbol or NO_NODE, index into `removed` of the left child or NO_NODE).
+        removed: list[tuple[int, int, int]] = []
+        internal: list[tuple[int, int, int]] = []
+        leaf_index = 0
+        internal_index = 0
+
+        def pop() -> tuple[int, int, int]:
+            nonlocal leaf_index, internal_index
+            if internal_index >= len(internal) or (
+                    leaf_index < len(queue) and queue[leaf_index][0] <= internal[internal_index][0]
+            ):
+                leaf_index += 1
+                return queue[leaf_index - 1]
+            internal_index += 1
+            return internal[internal_index - 1]
+
+        while len(queue) - leaf_index + len(internal) - internal_index >= 2:
+            a = pop()
+            b = pop()
+            removed.append(a)
+            removed.append(b)
+            internal.append((a[0] + b[0], NO_NODE, len(removed) - 2))
+        removed.append(pop())
+
+        first = self.root - len(removed) + 1
+        self.leaves = {}
+        for i, (weight, symbol, left_index) in enumerate(removed):
+            node = first + i
+            self.weight[node] = weight
+            if left_index == NO_NODE:
+                self.left[node] = self.right[node] = NO_NODE
+                self.symbol[node] = symbol
+                if symbol == NO_NODE:
+                    self.nyt = node
+                else:
+                    self.leaves[symbol] = node
+            else:
+                self.symbol[node] = NO_NODE
+                self.left[node] = first + left_index
+                self.right[node] = first + left_index + 1
+                self.parent[first + left_index] = node
+                self.parent[first + left_index + 1] = node
+        self.parent[self.root] = NO_NODE
+
+
+class AdaptiveHuffmanCodec(BaseCodec[int]):
+    """Single pass Huffman codec (FGK algorithm) for symbols of `symbol_bits` bits.
+
+    Encoder and decoder start with an empty tree and update it after each symbol,
+    so no codeword table needs to be transmitted and unbounded streams can be encoded.
+    """
+
+    has_static_codec_data = True
+
+    symbol_bits: int
+    max_weight: int
+
+    def __init__(self, symbol_bits: int = 8, max_weight: int = 2 ** 16):
+        self.symbol_bits = symbol_bits
+        self.max_weight = max_weight
+
+    def create_tree(self) -> AdaptiveHuffmanTree:
+        return AdaptiveHuffmanTree(self.symbol_bits, self.max_weight)
+
+    @classmethod
+    def decode_byte_stream(cls, serialization: bytes) -> Iterable[int]:
+        codec_data, enc_message, message_length = cls.parse_byte_stream(serialization)
+        symbol_bits, max_weight = pickle.loads(codec_data)
+        codec = cls(symbol_bits, max_weight)
+        return codec.decode(enc_message, max_length=message_length)
+
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        return pickle.dumps([self.symbol_bits, self.max_weight])
+
+    def iter_encode(self, message: Iterable[int], *, stats: EncodingStats = None) -> Iterator[bytes]:
+        """Encodes `message` lazily, yielding bytes as soon as they are complete.
+        The last byte is padded with zeros.
+        """
+        tree = self.create_tree()
+        bit_stream: list[Bit] = []
+        num_symbols = 0
+        num_bits = 0
+        for symbol in message:
+            num_symbols += 1
+            bit_stream.extend(tree.get_codeword(symbol))
+            tree.update(symbol)
+            num_complete_bits = len(bit_stream) - len(bit_stream) % 8
+            if num_complete_bits:
+                yield bytes(
+                    get_byte(bit_stream[i:i + 8])
+                    for i in range(0, num_complete_bits, 8)
+                )
+                del bit_stream[:num_complete_bits]
+                num_bits += num_complete_bits
+        num_bits += len(bit_stream)
+        if stats is not None:
+            stats.num_symbols = num_symbols
+            stats.num_bits = num_bits
+        if bit_stream:
+            yield bytes([get_byte(bit_stream)])
+
+    def encode(self, message: Iterable[int], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
+        return b''.join(self.iter_encode(message, stats=stats))
+
+    def decode(self, byte_stream: Iterable[int], *, max_length: int = None) -> Iterable[int]:
+        """`byte_stream` may be any iterable of bytes, e.g. a generator reading a socket.
+        Without `max_length`, the padding bits of the last byte may decode to extra symbols.
+        """
+        tree = self.create_tree()
+        bits: Iterator[Bit] = iter(read_bits(byte_stream))
+        num_symbols = 0
+        while max_length is None or num_symbols < max_length:
+            symbol = tree.decode_symbol(bits)
+            if symbol is None:
+                break
+            yield symbol
+            tree.update(symbol)
+            num_symbols += 1
@@ -1,12 +1,14 @@
+import heapq
 import itertools
-from collections import OrderedDict
+from bisect import bisect_right
+from collections import Counter, OrderedDict
 from collections.abc import Iterable
+from math import inf, log2
 from typing import Generic
 
-from tqdm import tqdm
-
-from prefix_codes.codecs.base import T
-from prefix_codes.codecs.shannon_fano_elias import ShannonFanoEliasCodec, ModelType
+from prefix_codes.alphabet import Alphabet
+from prefix_codes.codecs.base import EncodingStats, T
+from prefix_codes.codecs.shannon_fano_elias import MODEL_TYPES, ShannonFanoEliasCodec, ModelType
 from prefix_codes.typedefs import BitStream, Bit
 from prefix_codes.utils import set_bit, write_bits, read_bits_from_string, read_bits
 
@@ -56,32 +58,135 @@ class ArithmeticCodec(ShannonFanoEliasCodec, Generic[T]):
     """Quantized probability masses with V bits"""
     c_V: dict[T, float]
     """Quantized cumulative probabilities (cmf/cdf) with V bits"""
+    alphabet: Alphabet[T]
+    """The symbols in the order of `probabilities`"""
+    p_V_table: list[int]
+    """`p_V` indexed by alphabet ID"""
+    c_V_table: list[int]
+    """`c_V` indexed by alphabet ID"""
+
+    show_progress: bool
+    """Show a progress bar (requires tqdm) while encoding"""
 
     def __init__(self, probabilities: OrderedDict[T, float], model: ModelType = 'iid',
-                 prefix_free: bool = False, V: int = 4, U: int = 4):
+                 prefix_free: bool = False, V: int = 4, U: int = 4, show_progress: bool = False):
         super().__init__(probabilities, model, prefix_free)
         self.V = V
         self.U = U
+        self.show_progress = show_progress
         self.quantize_probabilities()
 
-    def quantize_probabilities(self):
-        self.p_V = {
-            symbol: round(prob * (2 ** self.V))
-            for symbol, prob in self.probabilities.items()
+    @classmethod
+    def from_message(cls, message: Iterable[T], U: int = 16):
+        return cls.from_counts(Counter(message), U=U)
+
+    @classmethod
+    def from_counts(cls, counts: dict[T, int], U: int = 16):
+        """Codec whose precision V makes the quantization (nearly) lossless for the counts."""
+        if not counts:
+            raise ValueError('cannot create an arithmetic code for an empty message')
+        V = cls.get_lossless_V(sum(counts.values()))
+        return cls.from_quantized_counts(cls.quantize_counts(counts, V), V=V, U=U)
+
+    @classmethod
+    def from_quantized_counts(cls, quantized_counts: dict[T, int], V: int, U: int, **kwargs):
+        """The probabilities `count / 2^V` are exact with V bits, so quantization is lossless."""
+        return cls(
+            OrderedDict(
+                (symbol, count / 2 ** V)
+                for symbol, count in quantized_counts.items()
+            ),
+            V=V,
+            U=U,
+            **kwargs,
+        )
+
+    @staticmethod
+    def get_lossless_V(message_length: int) -> int:
+        # with 2^V > message length, the quantized counts are (nearly) proportional to the counts
+        return max(8, message_length.bit_length())
+
+    @staticmethod
+    def quantize_counts(counts: dict[T, float], V: int) -> dict[T, int]:
+        """Scales counts (or probabilities) to integers summing up to exactly 2^V.
+        Every symbol gets at least 1, even if it would be rounded to 0.
+
+        Starting from the rounded counts, the remaining (or excess) mass is assigned one unit at a time
+        where it increases (or decreases) the expected codeword length the least.
+        """
+        scale = 2 ** V
+        assert len(counts) <= scale, f'{len(counts)} symbols do not fit into {V} bits. Try a greater precision'
+        total = sum(counts.values())
+        quantized = {
+            symbol: max(1, round(count * scale / total))
+            for symbol, count in counts.items()
         }
+
+        excess = sum(quantized.values()) - scale
+        step = -1 if excess > 0 else 1
+
+        def get_cost(symbol: T) -> float:
+            """Change of the expected codeword length (bits per symbol) by stepping the symbol's count."""
+            q = quantized[symbol]
+            if q + step == 0:
+                return inf
+            return counts[symbol] / total * log2(q / (q + step))
+
+        heap = [(get_cost(symbol), i, symbol) for i, symbol in enumerate(quantized)]
+        heapq.heapify(heap)
+        for _ in range(abs(excess)):
+            _, i, symbol = heapq.heappop(heap)
+            quantized[symbol] += step
+            heapq.heappush(heap, (get_cost(symbol), i, symbol))
+        return quantized
+
+    def quantize_probabilities(self):
+        self.p_V = self.quantize_counts(self.probabilities, self.V)
         accumulated_ps = list(itertools.accumulate(self.p_V.values(), initial=0))
         self.c_V = {
             symbol: accumulated_ps[i]
             for i, symbol in enumerate(self.probabilities)
         }
-        assert all(p > 0 for p in self.p_V.values()), 'all must probabilities must be > 0. Try a greater precision'
-        assert sum(self.p_V.values()) <= 2 ** self.V, 'invalid quantization'
+        self.alphabet = Alphabet(self.probabilities)
+        self.p_V_table = [self.p_V[symbol] for symbol in self.alphabet.symbols]
+        self.c_V_table = accumulated_ps[:-1]
+
+    @classmethod
+    def decode_byte_stream(cls, serialization: bytes) -> Iterable[T]:
+        codec_data, enc_message, message_length = cls.parse_byte_stream(serialization)
+        alphabet, offset = Alphabet.parse(codec_data)
+        model_index, prefix_free, V, U = codec_data[offset:offset + 4]
+        offset += 4
+        num_count_bytes = V // 8 + 1
+        quantized_counts = {}
+        for symbol in alphabet.symbols:
+            quantized_counts[symbol] = int.from_bytes(codec_data[offset:offset + num_count_bytes], byteorder='big')
+            offset += num_count_bytes
+        codec = cls.from_quantized_counts(
+            quantized_counts,
+            V=V,
+            U=U,
+            model=MODEL_TYPES[model_index],
+            prefix_free=bool(prefix_free),
+        )
+        return codec.decode(enc_message, max_length=message_length)
+
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        """The alphabet, model, prefix freeness, V, U and the quantized probabilities
+        (which reproduce themselves when quantized again).
+        """
+        num_count_bytes = self.V // 8 + 1  # a single symbol has p_V = 2^V
+        return (
+            self.alphabet.serialize()
+            + bytes([MODEL_TYPES.index(self.model), self.is_prefix_free, self.V, self.U])
+            + b''.join(p.to_bytes(num_count_bytes, byteorder='big') for p in self.p_V_table)
+        )
 
     def get_num_codeword_bits(self, message: Iterable[T]) -> int:
         a = 1 if self.is_prefix_free else 0
         return a + z_n - self.U + 1
 
-    def encode(self, message: Iterable[T], *, max_length: int = None) -> bytes:
+    def encode(self, message: Iterable[T], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
         V = self.V
         U = self.U
 
@@ -97,12 +202,22 @@ class ArithmeticCodec(ShannonFanoEliasCodec, Generic[T]):
 
         bit_stream: list[Bit] = []
 
+        symbol_ids = self.alphabet.to_ids(message)
+        if self.show_progress:
+            from tqdm import tqdm
+
+            symbol_ids = tqdm(symbol_ids)
+
         # ITERATIVE ENCODING
-        for symbol in tqdm(message, total=max_length):
+        p_V = self.p_V_table
+        c_V = self.c_V_table
+        num_symbols = 0
+        for symbol_id in symbol_ids:
+            num_symbols += 1
             # print('loop')
             # CALCULATE
-            A_ast = A * self.p_V[symbol]
-            B_ast = B + A * self.c_V[symbol]
+            A_ast = A * p_V[symbol_id]
+            B_ast = B + A * c_V[symbol_id]
             # print('A*', A_ast)
             # print('B*', B_ast)
 
@@ -181,6 +296,9 @@ class ArithmeticCodec(ShannonFanoEliasCodec, Generic[T]):
         bit_stream.extend(read_bits_from_string(B_most_significant_bits))
         # print('final bitstream', bit_stream)
 
+        if stats is not None:
+            stats.num_symbols = num_symbols
+            stats.num_bits = len(bit_stream)
         return write_bits(bit_stream)
 
     def decode(self, byte_stream: bytes, *, max_length: int = None, num_bits: int = None) -> Iterable[T]:
@@ -189,33 +307,30 @@ class ArithmeticCodec(ShannonFanoEliasCodec, Generic[T]):
 
         # INIT
         A = 2 ** self.U - 1
-        u = int(
-            ''.join(
-                str(bit) for bit in itertools.islice(read_bits(byte_stream), UV)
-            ),
-            base=2,
-        )
-        # print('init')
-        # print(A, u)
+        # NOTE: The codeword is padded with zeros.
+        bits = itertools.chain(read_bits(byte_stream), itertools.repeat(0))
+        u = 0
+        for bit in itertools.islice(bits, UV):
+            u = (u << 1) | bit
 
         # ITERATIVE DECODING
+        symbols = self.alphabet.symbols
+        p_V = self.p_V_table
+        c_V = self.c_V_table
+        # upper interval bounds (c_V + p_V) are ascending, so the symbol is found by bisection
+        upper_c_V = [c + p for c, p in zip(c_V, p_V)]
         for n in range(max_length):
-            # IDENTIFY NEXT SYMBOL
-            for symbol in self.probabilities:
-                U = A * (self.c_V[symbol] + self.p_V[symbol])
-                # print(f'U({symbol})', U)
-                if u < U:
-                    # print('output', symbol)
-                    yield symbol
-
-                    # UPDATE PARAMETERS
-                    A_ast = A * self.p_V[symbol]
-                    # print('A*', A_ast)
-                    u_ast = u - A * self.c_V[symbol]
-                    # print('u*', u_ast)
-                    delta_z = leading_zeros(A_ast, UV)
-                    # print('∆z', delta_z)
-                    u = (u - A * self.c_V[symbol]) << delta_z
-                    A = A_ast >> (V - delta_z)
-
-                    break
+            # IDENTIFY NEXT SYMBOL: the first with u < A * (c_V + p_V)
+            symbol_id = bisect_right(upper_c_V, u // A)
+            if symbol_id == len(symbols):
+                raise ValueError(f'invalid arithmetic code: no symbol matches the interval of symbol {n}')
+            yield symbols[symbol_id]
+
+            # UPDATE PARAMETERS
+            A_ast = A * p_V[symbol_id]
+            delta_z = min(leading_zeros(A_ast, UV), V)
+            u -= A * c_V[symbol_id]
+            # read the next delta_z bits of the codeword
+            for bit in itertools.islice(bits, delta_z):
+                u = (u << 1) | bit
+            A = A_ast >> (V - delta_z)
@@ -0,0 +1,125 @@
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Iterable, Sequence
+from math import log2
+from typing import NamedTuple, Optional
+
+from prefix_codes.codecs.arithmetic import ArithmeticCodec
+from prefix_codes.codecs.base import EncodingStats, T
+from prefix_codes.utils import get_entropy
+
+
+class ArithmeticParameters(NamedTuple):
+    U: int
+    V: int
+    entropy: float
+    """Bits per symbol"""
+    quantization_redundancy: float
+    """Bits per symbol lost by quantizing the probabilities with V bits"""
+    header_bits: int
+    """Bits of the codec data in a serialization (the quantized counts take V // 8 + 1 bytes each)"""
+    redundancy: float
+    """Measured bits per symbol minus the ideal code length of the sample
+    (quantization, finite precision of the interval width and termination)
+    plus the header bits spread over the whole message
+    """
+    encode_throughput: float
+    """Symbols per second (for information only, see `select_parameters`)"""
+    decode_throughput: float
+    """Symbols per second (for information only, see `select_parameters`)"""
+
+    def __str__(self):
+        return (
+            f'U={self.U:<2} V={self.V:<2} '
+            f'redundancy {self.redundancy:.4f} bits/symbol '
+            f'(quantization {self.quantization_redundancy:.4f}, header {self.header_bits} bits, '
+            f'entropy {self.entropy:.4f}) '
+            f'encode {self.encode_throughput / 1e3:.1f}k symbols/s '
+            f'decode {self.decode_throughput / 1e3:.1f}k symbols/s'
+        )
+
+
+def get_min_V(num_symbols: int) -> int:
+    """Smallest precision that gives every symbol a quantized probability > 0."""
+    return max(1, (num_symbols - 1).bit_length())
+
+
+def get_quantization_redundancy(counts: dict[T, int], V: int) -> float:
+    """Cross entropy of the quantized probabilities minus the entropy (bits per symbol)."""
+    total = sum(counts.values())
+    return sum(
+        count / total * log2(count / total * 2 ** V / quantized_count)
+        for (symbol, count), quantized_count in zip(
+            counts.items(),
+            ArithmeticCodec.quantize_counts(counts, V).values(),
+        )
+    )
+
+
+def sweep_parameters(message: Iterable[T], *, Us: Iterable[int] = (4, 8, 12, 16, 24, 32),
+                     Vs: Optional[Iterable[int]] = None, sample_size: int = 2 ** 12) -> list[ArithmeticParameters]:
+    """Encodes and decodes (the first `sample_size` symbols of) `message` with each combination
+    of `Us` and `Vs` using the probabilities of the whole message.
+    By default, `Vs` go from the smallest possible precision to the lossless one (see `ArithmeticCodec.get_lossless_V`).
+    The header is sent once per message, so its bits are divided by the length of the whole message.
+    """
+    symbols: Sequence[T] = message if isinstance(message, Sequence) else list(message)
+    counts = Counter(symbols)
+    n = sum(counts.values())
+    assert n > 0, 'cannot sweep parameters for an empty message'
+    probabilities = OrderedDict(
+        (symbol, count / n)
+        for symbol, count in counts.items()
+    )
+    entropy = get_entropy(probabilities)
+    if Vs is None:
+        min_V = get_min_V(len(counts))
+        max_V = max(min_V, ArithmeticCodec.get_lossless_V(n))
+        Vs = sorted({*range(min_V, max_V, 2), max_V})
+
+    sample = symbols[:sample_size]
+    # ideal code length of the sample with the exact probabilities
+    sample_information = -sum(log2(probabilities[symbol]) for symbol in sample)
+
+    results: list[ArithmeticParameters] = []
+    for V in Vs:
+        quantization_redundancy = get_quantization_redundancy(counts, V)
+        for U in Us:
+            codec = ArithmeticCodec(probabilities, V=V, U=U)
+            stats = EncodingStats()
+            start = time.perf_counter()
+            encoded = codec.encode(sample, stats=stats)
+            encode_time = time.perf_counter() - start
+            start = time.perf_counter()
+            decoded = list(codec.decode(encoded, max_length=len(sample)))
+            decode_time = time.perf_counter() - start
+            assert decoded == list(sample), f'U={U}, V={V} did not reproduce the message'
+            header_bits = 8 * len(codec.serialize_codec_data(stats))
+            results.append(ArithmeticParameters(
+                U=U,
+                V=V,
+                entropy=entropy,
+                quantization_redundancy=quantization_redundancy,
+                header_bits=header_bits,
+                redundancy=(stats.num_bits - sample_information) / len(sample) + header_bits / n,
+                encode_throughput=len(sample) / encode_time,
+                decode_throughput=len(sample) / decode_time,
+            ))
+    return results
+
+
+def select_parameters(results: list[ArithmeticParameters], *, max_redundancy: float = 0.01) -> ArithmeticParameters:
+    """The smallest precisions (V, then U) whose redundancy does not exceed `max_redundancy` bits per symbol,
+    or the parameters with the least redundancy if none qualifies.
+    Smaller precisions mean smaller integers (i.e. faster arithmetic) and headers, but unlike the measured
+    throughputs, they give the same selection on every run.
+    """
+    assert results, 'no parameters to select from'
+    qualified = [
+        parameters
+        for parameters in results
+        if parameters.redundancy <= max_redundancy
+    ]
+    if not qualified:
+        return min(results, key=lambda parameters: (parameters.redundancy, parameters.V, parameters.U))
+    return min(qualified, key=lambda parameters: (parameters.V, parameters.U))
@@ -0,0 +1,214 @@
+import asyncio
+import itertools
+from collections.abc import AsyncIterable, AsyncIterator, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Generic, Optional, TypeVar, Union
+
+from prefix_codes.codecs.base import BaseCodec, T
+
+R = TypeVar('R')
+
+ByteSource = Union[bytes, AsyncIterable[bytes]]
+
+_shared_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_shared_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool used by all `AsyncCodec`s that are not given an explicit executor."""
+    global _shared_executor
+    if _shared_executor is None:
+        _shared_executor = ThreadPoolExecutor(thread_name_prefix='prefix_codes')
+    return _shared_executor
+
+
+async def read_byte_source(source: ByteSource, max_bytes: Optional[int] = None) -> bytes:
+    """Joins the chunks of `source`. Raises `ValueError` as soon as more than `max_bytes` bytes arrive."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        message = bytes(source)
+    else:
+        chunks = bytearray()
+        async for chunk in source:
+            chunks += chunk
+            if max_bytes is not None and len(chunks) > max_bytes:
+                break
+        message = bytes(chunks)
+    if max_bytes is not None and len(message) > max_bytes:
+        raise ValueError(f'the input exceeds {max_bytes} bytes')
+    return message
+
+
+def _encode(codec: BaseCodec[T], message: bytes) -> bytes:
+    return codec.encode(message)
+
+
+def _serialize(codec: BaseCodec[T], message: bytes) -> bytes:
+    return codec.serialize(message)
+
+
+def _start_encode(codec: BaseCodec[T], message: bytes) -> Iterator[bytes]:
+    return iter(codec.iter_encode(message))
+
+
+def _start_serialize(codec: BaseCodec[T], message: bytes) -> Iterator[bytes]:
+    return iter(codec.iter_serialize(message))
+
+
+def _start_decode(codec: BaseCodec[T], byte_stream: bytes, max_length: Optional[int]) -> Iterator[T]:
+    # eager decoders (e.g. LZ77's) do all their work here
+    return iter(codec.decode(byte_stream, max_length=max_length))
+
+
+def _start_decode_byte_stream(codec_class: type[BaseCodec[T]], serialization: bytes) -> Iterator[T]:
+    return iter(codec_class.decode_byte_stream(serialization))
+
+
+def _decode_all(codec: BaseCodec[T], byte_stream: bytes, max_length: Optional[int]) -> list[T]:
+    return list(codec.decode(byte_stream, max_length=max_length))
+
+
+def _decode_byte_stream_all(codec_class: type[BaseCodec[T]], serialization: bytes) -> list[T]:
+    return list(codec_class.decode_byte_stream(serialization))
+
+
+def _take(symbols: Iterator[T], n: int) -> list[T]:
+    return list(itertools.islice(symbols, n))
+
+
+def _take_bytes(parts: Iterator[bytes], n: int) -> bytes:
+    """Joins the next parts until they contain at least `n` bytes (or `parts` is exhausted)."""
+    taken = bytearray()
+    for part in parts:
+        taken += part
+        if len(taken) >= n:
+            break
+    return bytes(taken)
+
+
+class AsyncCodec(Generic[T]):
+    """Asyncio facade for a codec.
+
+    The CPU bound work is run on an executor (a shared thread pool by default).
+    A job holds one of `max_concurrency` slots from before its input is read until its output
+    is consumed, and inputs larger than `max_input_bytes` are rejected, so that at most
+    `max_concurrency * max_input_bytes` input bytes are buffered at any time.
+    Encoded chunks of at most `chunk_size` bytes and decoded batches of `batch_size` symbols
+    are only produced once the consumer asks for them (see `BaseCodec.iter_encode`),
+    so a slow consumer never makes output pile up in memory.
+    """
+
+    codec: BaseCodec[T]
+    executor: Executor
+    batch_size: int
+    chunk_size: int
+    max_input_bytes: int
+
+    def __init__(
+            self,
+            codec: BaseCodec[T],
+            *,
+            executor: Executor = None,
+            max_concurrency: int = 4,
+            batch_size: int = 2 ** 16,
+            chunk_size: int = 2 ** 16,
+            max_input_bytes: int = 2 ** 26,
+    ):
+        assert max_concurrency > 0, 'max_concurrency must be positive'
+        self.codec = codec
+        self.executor = executor if executor is not None else get_shared_executor()
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.max_input_bytes = max_input_bytes
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def is_process_based(self) -> bool:
+        return isinstance(self.executor, ProcessPoolExecutor)
+
+    async def _run(self, func, *args) -> R:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def _read(self, source: ByteSource) -> bytes:
+        return await read_byte_source(source, self.max_input_bytes)
+
+    async def encode(self, message: ByteSource) -> bytes:
+        async with self._semaphore:
+            return await self._run(_encode, self.codec, await self._read(message))
+
+    async def serialize(self, message: ByteSource) -> bytes:
+        async with self._semaphore:
+            return await self._run(_serialize, self.codec, await self._read(message))
+
+    async def encode_stream(self, message: ByteSource) -> AsyncIterator[bytes]:
+        """Like `encode` but yields the encoded message in chunks of at most `chunk_size` bytes."""
+        async with self._semaphore:
+            message = await self._read(message)
+            if self.is_process_based:
+                # Generators cannot be sent to another process
+                # so the whole message is encoded in one job.
+                chunks = self._chunks(await self._run(_encode, self.codec, message))
+            else:
+                chunks = self._drain_bytes(await self._run(_start_encode, self.codec, message))
+            async for chunk in chunks:
+                yield chunk
+
+    async def serialize_stream(self, message: ByteSource) -> AsyncIterator[bytes]:
+        """Like `serialize` but yields the serialization in chunks of at most `chunk_size` bytes."""
+        async with self._semaphore:
+            message = await self._read(message)
+            if self.is_process_based:
+                chunks = self._chunks(await self._run(_serialize, self.codec, message))
+            else:
+                chunks = self._drain_bytes(await self._run(_start_serialize, self.codec, message))
+            async for chunk in chunks:
+                yield chunk
+
+    async def decode(self, byte_stream: ByteSource, *, max_length: int = None) -> AsyncIterator[list[T]]:
+        async with self._semaphore:
+            byte_stream = await self._read(byte_stream)
+            if self.is_process_based:
+                # Generators cannot be sent to another process
+                # so the whole message is decoded in one job.
+                symbols = await self._run(_decode_all, self.codec, byte_stream, max_length)
+                async for batch in self._batches(symbols):
+                    yield batch
+            else:
+                symbols = await self._run(_start_decode, self.codec, byte_stream, max_length)
+                async for batch in self._drain(symbols):
+                    yield batch
+
+    async def decode_byte_stream(self, serialization: ByteSource) -> AsyncIterator[list[T]]:
+        async with self._semaphore:
+            serialization = await self._read(serialization)
+            codec_class = type(self.codec)
+            if self.is_process_based:
+                symbols = await self._run(_decode_byte_stream_all, codec_class, serialization)
+                async for batch in self._batches(symbols):
+                    yield batch
+            else:
+                symbols = await self._run(_start_decode_byte_stream, codec_class, serialization)
+                async for batch in self._drain(symbols):
+                    yield batch
+
+    async def _drain(self, symbols: Iterator[T]) -> AsyncIterator[list[T]]:
+        while True:
+            batch = await self._run(_take, symbols, self.batch_size)
+            if not batch:
+                return
+            yield batch
+
+    async def _drain_bytes(self, parts: Iterator[bytes]) -> AsyncIterator[bytes]:
+        while True:
+            taken = await self._run(_take_bytes, parts, self.chunk_size)
+            if not taken:
+                return
+            for start in range(0, len(taken), self.chunk_size):
+                yield taken[start:start + self.chunk_size]
+
+    async def _chunks(self, data: bytes) -> AsyncIterator[bytes]:
+        for start in range(0, len(data), self.chunk_size):
+            yield data[start:start + self.chunk_size]
+
+    async def _batches(self, symbols: list[T]) -> AsyncIterator[list[T]]:
+        for start in range(0, len(symbols), self.batch_size):
+            yield symbols[start:start + self.batch_size]
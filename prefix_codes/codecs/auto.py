@@ -0,0 +1,206 @@
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from enum import IntEnum
+from math import ceil
+
+from prefix_codes.codecs.arithmetic import ArithmeticCodec
+from prefix_codes.codecs.base import BaseCodec, EncodingStats
+from prefix_codes.codecs.tree_based import TreeBasedCodec
+from prefix_codes.codes.canonical import create_canonical_table
+from prefix_codes.codes.huffman import create_huffman_tree_from_frequencies
+from prefix_codes.utils import as_buffer, get_entropy
+
+BLOCK_HEADER_BYTES = 9
+"""method (1 byte), block length (4 bytes), payload length (4 bytes)"""
+
+
+class BlockMethod(IntEnum):
+    STORED = 0
+    HUFFMAN = 1
+    ARITHMETIC = 2
+
+
+class AutoCodec(BaseCodec[int]):
+    """Splits a byte message into blocks and picks the cheapest method for each block:
+    storing it raw, Huffman coding (`TreeBasedCodec`) or arithmetic coding (`ArithmeticCodec`).
+
+    The choice is made from the symbol counts of the block without encoding it.
+    Since arithmetic coding is a lot slower, it is only used if its estimated size
+    is at least `arithmetic_min_gain` (relative) smaller than Huffman's.
+    The code tables are stored compactly per block:
+    Huffman blocks store the codeword lengths of a canonical code,
+    arithmetic blocks store the quantized symbol counts.
+    """
+
+    has_static_codec_data = True
+
+    block_size: int
+    arithmetic_min_gain: float
+    arithmetic_U: int
+
+    def __init__(self, block_size: int = 2 ** 16, arithmetic_min_gain: float = 0.03, arithmetic_U: int = 16):
+        assert 0 < block_size < 2 ** 32, 'invalid block size'
+        self.block_size = block_size
+        self.arithmetic_min_gain = arithmetic_min_gain
+        self.arithmetic_U = arithmetic_U
+
+    @classmethod
+    def decode_byte_stream(cls, serialization: bytes) -> Iterable[int]:
+        codec_data, enc_message, message_length = cls.parse_byte_stream(serialization)
+        return cls().decode(enc_message, max_length=message_length)
+
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        # the tables are part of each block
+        return b''
+
+    def encode(self, message: Iterable[int], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
+        return b''.join(self.iter_encode(message, stats=stats))
+
+    def iter_encode(self, message: Iterable[int], *, stats: EncodingStats = None) -> Iterator[bytes]:
+        """Yields the encoded blocks one by one."""
+        buffer = as_buffer(message)
+        if buffer is not None and buffer.format == 'B':
+            message = buffer
+        else:
+            # iterate instead of copying the memory of other buffers (e.g. 16 bit arrays)
+            message = bytes(iter(message))
+        num_bits = 0
+        for start in range(0, len(message), self.block_size):
+            encoded_block = self.encode_block(message[start:start + self.block_size])
+            num_bits += 8 * len(encoded_block)
+            yield encoded_block
+        if stats is not None:
+            stats.num_symbols = len(message)
+            stats.num_bits = num_bits
+
+    def decode(self, byte_stream: bytes, *, max_length: int = None) -> Iterable[int]:
+        num_symbols = 0
+        offset = 0
+        while offset < len(byte_stream):
+            if max_length is not None and num_symbols >= max_length:
+                break
+
+            method = BlockMethod(byte_stream[offset])
+            block_length = int.from_bytes(byte_stream[offset + 1:offset + 5], byteorder='big')
+            payload_length = int.from_bytes(byte_stream[offset + 5:offset + 9], byteorder='big')
+            offset += BLOCK_HEADER_BYTES
+            payload = byte_stream[offset:offset + payload_length]
+            offset += payload_length
+
+            yield from self.decode_block(method, payload, block_length)
+            num_symbols += block_length
+
+    def choose_method(self, counter: Counter[int], block_length: int) -> tuple[BlockMethod, dict[int, str]]:
+        """Estimates the encoded size of each method.
+        Returns the cheapest method and the Huffman table (needed for encoding anyway).
+        """
+        if not counter:
+            # an empty block has no code
+            return BlockMethod.STORED, {}
+        relative_frequencies = {
+            symbol: count / block_length
+            for symbol, count in counter.items()
+        }
+        huffman_table = create_huffman_tree_from_frequencies(relative_frequencies).get_table()
+        huffman_size = (
+            1 + 2 * len(counter)
+            + ceil(sum(count * len(huffman_table[symbol]) for symbol, count in counter.items()) / 8)
+        )
+        V = ArithmeticCodec.get_lossless_V(block_length)
+        arithmetic_size = (
+            3 + len(counter) * (2 + V // 8)
+            + ceil(block_length * get_entropy(relative_frequencies) / 8)
+            + ceil((self.arithmetic_U + V) / 8)  # termination
+        )
+
+        method = BlockMethod.HUFFMAN
+        size = huffman_size
+        if arithmetic_size <= huffman_size * (1 - self.arithmetic_min_gain):
+            method = BlockMethod.ARITHMETIC
+            size = arithmetic_size
+        if size >= block_length:
+            method = BlockMethod.STORED
+        return method, huffman_table
+
+    def encode_block(self, block: memoryview) -> bytes:
+        counter = Counter(block)
+        method, huffman_table = self.choose_method(counter, len(block))
+        match method:
+            case BlockMethod.HUFFMAN:
+                payload = self.encode_huffman_block(block, huffman_table)
+            case BlockMethod.ARITHMETIC:
+                payload = self.encode_arithmetic_block(block, counter)
+            case _:
+                payload = block
+        if method != BlockMethod.STORED and len(payload) >= len(block):
+            method = BlockMethod.STORED
+            payload = block
+        return (
+            bytes([method])
+            + len(block).to_bytes(4, byteorder='big')
+            + len(payload).to_bytes(4, byteorder='big')
+            + payload
+        )
+
+    def decode_block(self, method: BlockMethod, payload: bytes, block_length: int) -> Iterable[int]:
+        match method:
+            case BlockMethod.HUFFMAN:
+                return self.decode_huffman_block(payload, block_length)
+            case BlockMethod.ARITHMETIC:
+                return self.decode_arithmetic_block(payload, block_length)
+            case _:
+                return payload
+
+    @staticmethod
+    def encode_huffman_block(block: memoryview, huffman_table: dict[int, str]) -> bytes:
+        codeword_lengths = {
+            symbol: len(codeword)
+            for symbol, codeword in huffman_table.items()
+        }
+        codec = TreeBasedCodec.from_table(create_canonical_table(codeword_lengths))
+        return (
+            bytes([len(codeword_lengths) - 1])
+            + bytes(byte for item in codeword_lengths.items() for byte in item)
+            + codec.encode(block)
+        )
+
+    @staticmethod
+    def decode_huffman_block(payload: bytes, block_length: int) -> Iterable[int]:
+        num_symbols = payload[0] + 1
+        codeword_lengths = {
+            payload[i]: payload[i + 1]
+            for i in range(1, 1 + 2 * num_symbols, 2)
+        }
+        codec = TreeBasedCodec.from_table(create_canonical_table(codeword_lengths))
+        return codec.decode(payload[1 + 2 * num_symbols:], max_length=block_length)
+
+    def encode_arithmetic_block(self, block: memoryview, counter: Counter[int]) -> bytes:
+        V = ArithmeticCodec.get_lossless_V(len(block))
+        U = self.arithmetic_U
+        quantized_counts = ArithmeticCodec.quantize_counts(counter, V)
+        codec = ArithmeticCodec.from_quantized_counts(quantized_counts, V=V, U=U)
+        num_count_bytes = V // 8 + 1  # a single symbol has count 2^V
+        return (
+            bytes([V, U, len(quantized_counts) - 1])
+            + b''.join(
+                bytes([symbol]) + count.to_bytes(num_count_bytes, byteorder='big')
+                for symbol, count in quantized_counts.items()
+            )
+            + codec.encode(block)
+        )
+
+    @staticmethod
+    def decode_arithmetic_block(payload: bytes, block_length: int) -> Iterable[int]:
+        V, U, num_symbols = payload[0], payload[1], payload[2] + 1
+        num_count_bytes = V // 8 + 1
+        item_size = 1 + num_count_bytes
+        offset = 3
+        quantized_counts = {}
+        for _ in range(num_symbols):
+            quantized_counts[payload[offset]] = int.from_bytes(
+                payload[offset + 1:offset + item_size],
+                byteorder='big',
+            )
+            offset += item_size
+        codec = ArithmeticCodec.from_quantized_counts(quantized_counts, V=V, U=U)
+        return codec.decode(payload[offset:], max_length=block_length)
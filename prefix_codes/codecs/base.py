@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from collections.abc import Hashable, Iterable
+from collections.abc import Hashable, Iterable, Iterator, Sized
 from math import ceil
 from typing import TypeVar, Generic
 
@@ -8,8 +8,21 @@ T = TypeVar('T', bound=Hashable)
 META_BYTES = 30
 
 
+class EncodingStats:
+    """Filled in by `BaseCodec.encode` while it walks the message."""
+
+    num_symbols: int = 0
+    num_bits: int = 0
+    """Number of bits of the encoded message without padding"""
+
+
 class BaseCodec(ABC, Generic[T]):
 
+    has_static_codec_data: bool = False
+    """`serialize_codec_data` does not depend on the encoding statistics
+    (except `num_symbols`, i.e. the message length), so `iter_serialize` can emit the header before encoding
+    """
+
     @staticmethod
     def parse_byte_stream(serialization: bytes) -> tuple[bytes, bytes, int]:
         meta = serialization[:META_BYTES]
@@ -27,17 +40,66 @@ class BaseCodec(ABC, Generic[T]):
     def decode_byte_stream(cls, serialization: bytes) -> Iterable[T]:
         ...
 
+    @classmethod
+    def from_message(cls, message: Iterable[T]) -> 'BaseCodec[T]':
+        """Creates a codec suited for encoding `message`.
+        Codecs that need a model of the message override this.
+        """
+        return cls()
+
     @abstractmethod
-    def encode(self, message: Iterable[T], *, max_length: int = None) -> bytes:
+    def encode(self, message: Iterable[T], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
+        """Encodes `message` in a single pass, so `message` may be a generator.
+        If given, `stats` is filled in with the number of symbols and bits.
+        """
         ...
 
+    def iter_encode(self, message: Iterable[T], *, stats: EncodingStats = None) -> Iterator[bytes]:
+        """Like `encode` but yields the encoded message in parts, so that it is never held in memory at once.
+        Codecs that can emit parts before the whole message is encoded override this.
+        """
+        yield self.encode(message, stats=stats)
+
     @abstractmethod
     def decode(self, byte_stream: bytes, *, max_length: int = None) -> Iterable[T]:
         ...
 
+    def decode_into(self, byte_stream: bytes, buffer, *, max_length: int = None) -> int:
+        """Writes the decoded symbols into the writable `buffer` (e.g. a `bytearray` or an `array.array`).
+        Decodes at most `len(buffer)` symbols. Returns the number of decoded symbols.
+        """
+        view = memoryview(buffer)
+        max_length = len(view) if max_length is None else min(max_length, len(view))
+        num_symbols = 0
+        for num_symbols, symbol in enumerate(self.decode(byte_stream, max_length=max_length), start=1):
+            view[num_symbols - 1] = symbol
+        return num_symbols
+
     def serialize(self, message: Iterable[T]) -> bytes:
-        codec_data = self.serialize_codec_data(message)
-        message_length = len(list(message))
+        """Encodes `message` in a single pass. The header is assembled afterwards
+        from the statistics the encoder collected along the way.
+        """
+        stats = EncodingStats()
+        enc_message = self.encode(message, stats=stats)
+        return self.create_byte_stream(self.serialize_codec_data(stats), stats.num_symbols, enc_message)
+
+    def iter_serialize(self, message: Iterable[T]) -> Iterator[bytes]:
+        """Like `serialize` but yields the serialization in parts (see `iter_encode`).
+        This requires the header to be known up front, i.e. `has_static_codec_data` and a sized message.
+        Otherwise, the whole serialization is yielded at once.
+        """
+        if not self.has_static_codec_data or not isinstance(message, Sized):
+            yield self.serialize(message)
+            return
+        stats = EncodingStats()
+        stats.num_symbols = len(message)
+        yield self.create_byte_stream(self.serialize_codec_data(stats), len(message), b'')
+        yield from self.iter_encode(message, stats=stats)
+        assert stats.num_symbols == len(message), 'the message length changed while encoding'
+
+    @staticmethod
+    def create_byte_stream(codec_data: bytes, message_length: int, enc_message: bytes) -> bytes:
+        """Inverse of `parse_byte_stream`."""
         assert ceil(len(codec_data).bit_length() / 8) <= META_BYTES // 2, (
             f'codec data is too large'
         )
@@ -48,9 +110,10 @@ class BaseCodec(ABC, Generic[T]):
             len(codec_data).to_bytes(length=META_BYTES // 2, byteorder='big')
             + message_length.to_bytes(length=META_BYTES // 2, byteorder='big')
             + codec_data
-            + self.encode(message)
+            + enc_message
         )
 
     @abstractmethod
-    def serialize_codec_data(self, message: Iterable[T]) -> bytes:
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        """Data needed (besides the message length) to decode the message that produced `stats`."""
         ...
@@ -0,0 +1,223 @@
+import itertools
+import zlib
+from collections.abc import Iterable, Iterator
+from typing import Generic, NamedTuple, Optional
+
+from prefix_codes.codecs.base import META_BYTES, BaseCodec, EncodingStats, T
+from prefix_codes.codecs.registry import get_codec_class, get_codec_name
+from prefix_codes.utils import as_buffer
+
+BLOCK_HEADER_BYTES = 17
+"""flag (1 byte), block length, codec data length, payload length, CRC32 (4 bytes each)"""
+CHECKSUM_OFFSET = 13
+
+
+class ChecksumError(ValueError):
+    """Raised when a block (or the header or shared codec data) does not match its checksum,
+    or when blocks are missing.
+    """
+
+    block_index: Optional[int]
+    """`None` for the header and the shared codec data"""
+
+    def __init__(self, message: str, block_index: Optional[int] = None):
+        super().__init__(message)
+        self.block_index = block_index
+
+
+class DecodedBlock(NamedTuple, Generic[T]):
+    index: int
+    length: int
+    symbols: Optional[list[T]]
+    """`None` if the block is corrupted"""
+    error: Optional[Exception]
+
+
+class ChecksummedCodec(BaseCodec, Generic[T]):
+    """Wraps a registered codec: the message is split into blocks that are encoded independently
+    with the wrapped codec, and each block frame carries a CRC32 (`zlib.crc32`) of its header,
+    codec data and payload. The CRC is updated incrementally while a frame is assembled.
+
+    The header (the lengths of the codec data and the message and the wrapped codec's name)
+    has its own CRC. Codec data that is equal for all blocks (e.g. a Huffman tree) is stored once
+    in the header (with its own CRC), other codec data is stored per block.
+    A corrupted block is detected before it is decoded and does not affect other blocks,
+    as long as the lengths in its frame are intact.
+    Set `verify=False` to skip the checksums for maximum throughput.
+    """
+
+    has_static_codec_data = True
+
+    codec_class: type[BaseCodec[T]]
+    codec: Optional[BaseCodec[T]]
+    """Wrapped codec (only needed for encoding)"""
+    block_size: int
+    verify: bool
+    shared_codec_data: Optional[bytes]
+    """Codec data of blocks without their own, `None` if its checksum does not match (decoding)"""
+
+    def __init__(self, codec: BaseCodec[T] = None, block_size: int = 2 ** 16, verify: bool = True, *,
+                 codec_class: type[BaseCodec[T]] = None, shared_codec_data: Optional[bytes] = None):
+        """Pass the wrapped `codec` for encoding or its `codec_class` and `shared_codec_data` for decoding."""
+        assert 0 < block_size < 2 ** 32, 'invalid block size'
+        assert codec is not None or codec_class is not None, 'either codec or codec_class is required'
+        self.codec_class = type(codec) if codec is not None else codec_class
+        self.codec = codec
+        self.block_size = block_size
+        self.verify = verify
+        self.shared_codec_data = (
+            codec.serialize_codec_data(EncodingStats()) if codec is not None
+            else shared_codec_data
+        )
+
+    @staticmethod
+    def get_header_checksum(codec_data: bytes, message_length: int) -> int:
+        """CRC32 of the byte stream's meta bytes and the wrapped codec's name (see `serialize_codec_data`)"""
+        name_length = codec_data[0]
+        meta = BaseCodec.create_byte_stream(codec_data, message_length, b'')[:META_BYTES]
+        return zlib.crc32(codec_data[:1 + name_length], zlib.crc32(meta))
+
+    @classmethod
+    def from_codec_data(cls, codec_data: bytes, message_length: int, *, verify: bool = True) -> 'ChecksummedCodec[T]':
+        """Codec for decoding. Raises `ChecksumError` if the header is corrupted.
+        Does not raise if the shared codec data is corrupted,
+        because blocks with their own codec data can still be decoded.
+        """
+        name_length = codec_data[0] if codec_data else 0
+        header_checksum = int.from_bytes(codec_data[1 + name_length:5 + name_length], byteorder='big')
+        if verify and (not codec_data or cls.get_header_checksum(codec_data, message_length) != header_checksum):
+            raise ChecksumError('the header does not match its checksum')
+        checksum = int.from_bytes(codec_data[5 + name_length:9 + name_length], byteorder='big')
+        shared_codec_data = codec_data[9 + name_length:]
+        if verify and zlib.crc32(shared_codec_data) != checksum:
+            shared_codec_data = None
+        return cls(
+            verify=verify,
+            codec_class=get_codec_class(codec_data[1:1 + name_length].decode()),
+            shared_codec_data=shared_codec_data,
+        )
+
+    @classmethod
+    def decode_byte_stream(cls, serialization: bytes, *, verify: bool = True) -> Iterable[T]:
+        codec_data, enc_message, message_length = cls.parse_byte_stream(serialization)
+        codec = cls.from_codec_data(codec_data, message_length, verify=verify)
+        return codec.decode(enc_message, max_length=message_length)
+
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        """The wrapped codec's name, the header CRC (see `get_header_checksum`, it depends on the message length)
+        and the shared codec data with its CRC.
+        """
+        name = get_codec_name(self.codec_class).encode()
+        shared_codec_data = (
+            zlib.crc32(self.shared_codec_data).to_bytes(4, byteorder='big')
+            + self.shared_codec_data
+        )
+        codec_data = bytes([len(name)]) + name + bytes(4) + shared_codec_data
+        header_checksum = self.get_header_checksum(codec_data, stats.num_symbols)
+        return bytes([len(name)]) + name + header_checksum.to_bytes(4, byteorder='big') + shared_codec_data
+
+    def iter_blocks(self, message: Iterable[T]) -> Iterator[Iterable[T]]:
+        buffer = as_buffer(message)
+        if buffer is not None:
+            for start in range(0, len(buffer), self.block_size):
+                yield buffer[start:start + self.block_size]
+            return
+        symbols = iter(message)
+        while block := list(itertools.islice(symbols, self.block_size)):
+            yield block
+
+    def encode(self, message: Iterable[T], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
+        return b''.join(self.iter_encode(message, stats=stats))
+
+    def iter_encode(self, message: Iterable[T], *, stats: EncodingStats = None) -> Iterator[bytes]:
+        """Yields the block frames one by one."""
+        num_symbols = 0
+        num_bits = 0
+        for block in self.iter_blocks(message):
+            frame = self.encode_block(block)
+            num_symbols += int.from_bytes(frame[1:5], byteorder='big')
+            num_bits += 8 * len(frame)
+            yield frame
+        if stats is not None:
+            stats.num_symbols = num_symbols
+            stats.num_bits = num_bits
+
+    def encode_block(self, block: Iterable[T]) -> bytes:
+        block_stats = EncodingStats()
+        payload = self.codec.encode(block, stats=block_stats)
+        codec_data = self.codec.serialize_codec_data(block_stats)
+        is_shared = codec_data == self.shared_codec_data
+        if is_shared:
+            codec_data = b''
+        header = (
+            bytes([0 if is_shared else 1])
+            + block_stats.num_symbols.to_bytes(4, byteorder='big')
+            + len(codec_data).to_bytes(4, byteorder='big')
+            + len(payload).to_bytes(4, byteorder='big')
+        )
+        checksum = zlib.crc32(payload, zlib.crc32(codec_data, zlib.crc32(header)))
+        return header + checksum.to_bytes(4, byteorder='big') + codec_data + payload
+
+    def decode(self, byte_stream: bytes, *, max_length: int = None) -> Iterable[T]:
+        """Raises `ChecksumError` at the first corrupted block (after yielding the preceding blocks).
+        Use `decode_blocks` to decode the other blocks anyway.
+        """
+        for block in self.decode_blocks(byte_stream, max_length=max_length):
+            if block.error is not None:
+                raise block.error
+            yield from block.symbols
+
+    def decode_blocks(self, byte_stream: bytes, *, max_length: int = None) -> Iterator[DecodedBlock[T]]:
+        """Decodes each block on its own. Errors are reported per block instead of being raised.
+        If the blocks contain fewer than `max_length` symbols, the missing symbols are reported as a last block.
+        """
+        num_symbols = 0
+        offset = 0
+        for index in itertools.count():
+            if max_length is not None and num_symbols >= max_length:
+                return
+            if offset >= len(byte_stream):
+                if max_length is not None:
+                    error = ChecksumError(f'the blocks contain {num_symbols} of {max_length} symbols', index)
+                    yield DecodedBlock(index, max_length - num_symbols, None, error)
+                return
+            header = byte_stream[offset:offset + BLOCK_HEADER_BYTES]
+            has_codec_data = header[0] == 1
+            block_length, codec_data_length, payload_length, checksum = (
+                int.from_bytes(header[i:i + 4], byteorder='big')
+                for i in range(1, BLOCK_HEADER_BYTES, 4)
+            )
+            end = offset + BLOCK_HEADER_BYTES + codec_data_length + payload_length
+            if len(header) < BLOCK_HEADER_BYTES or end > len(byte_stream):
+                yield DecodedBlock(index, block_length, None, ChecksumError(f'block {index} is truncated', index))
+                return
+            codec_data = byte_stream[offset + BLOCK_HEADER_BYTES:offset + BLOCK_HEADER_BYTES + codec_data_length]
+            payload = byte_stream[end - payload_length:end]
+            offset = end
+            num_symbols += block_length
+
+            if self.verify:
+                actual_checksum = zlib.crc32(
+                    payload,
+                    zlib.crc32(codec_data, zlib.crc32(header[:CHECKSUM_OFFSET])),
+                )
+                if actual_checksum != checksum:
+                    error = ChecksumError(f'block {index} does not match its checksum', index)
+                    yield DecodedBlock(index, block_length, None, error)
+                    continue
+            if not has_codec_data:
+                if self.shared_codec_data is None:
+                    error = ChecksumError(f'shared codec data of block {index} does not match its checksum')
+                    yield DecodedBlock(index, block_length, None, error)
+                    continue
+                codec_data = self.shared_codec_data
+
+            try:
+                symbols = list(self.codec_class.decode_byte_stream(
+                    self.create_byte_stream(codec_data, block_length, payload)
+                ))
+            except Exception as e:
+                # only reachable without verification (or for encoder bugs)
+                yield DecodedBlock(index, block_length, None, e)
+            else:
+                yield DecodedBlock(index, block_length, symbols, None)
@@ -0,0 +1,156 @@
+import itertools
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor
+from math import ceil
+from typing import Any, Generic, Literal, Optional
+
+from prefix_codes.binary_tree import BinaryTree
+from prefix_codes.codecs.base import EncodingStats, T
+from prefix_codes.codecs.tree_based import TreeBasedCodec
+
+SplitMode = Literal['round-robin', 'contiguous']
+SPLIT_MODES: list[SplitMode] = ['round-robin', 'contiguous']
+_MISSING = object()
+
+
+def _decode_stream(codec: TreeBasedCodec[T], stream: bytes, length: int) -> list[T]:
+    return list(TreeBasedCodec.decode(codec, stream, length))
+
+
+class InterleavedTreeBasedCodec(TreeBasedCodec, Generic[T]):
+    """Splits the message into `num_streams` independent bitstreams that share one table
+    (like Huff0's 4 streams).
+
+    The encoded message starts with the number of streams (1 byte), the split mode (1 byte)
+    and the size of each stream (4 bytes each).
+    Since a codeword's position only depends on the previous codeword of the same stream,
+    the streams can be advanced alternately or decoded on separate workers.
+    """
+
+    num_streams: int
+    split: SplitMode
+
+    def __init__(self, tree: Optional[BinaryTree[T, Any]], table: dict[T, str],
+                 num_streams: int = 4, split: SplitMode = 'round-robin'):
+        super().__init__(tree, table)
+        assert 0 < num_streams < 256, 'invalid number of streams'
+        assert split in SPLIT_MODES, f'invalid split mode {split}'
+        self.num_streams = num_streams
+        self.split = split
+
+    @staticmethod
+    def get_stream_lengths(message_length: int, num_streams: int, split: SplitMode) -> list[int]:
+        match split:
+            case 'round-robin':
+                return [len(range(i, message_length, num_streams)) for i in range(num_streams)]
+            case _:
+                quarter = ceil(message_length / num_streams)
+                return [
+                    max(0, min(quarter, message_length - i * quarter))
+                    for i in range(num_streams)
+                ]
+
+    def split_message(self, message: Iterable[T]) -> list[list[T]]:
+        message = list(message)
+        match self.split:
+            case 'round-robin':
+                return [message[i::self.num_streams] for i in range(self.num_streams)]
+            case _:
+                quarter = ceil(len(message) / self.num_streams)
+                return [message[i * quarter:(i + 1) * quarter] for i in range(self.num_streams)]
+
+    def encode(self, message: Iterable[T], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
+        streams = []
+        num_symbols = 0
+        num_bits = 0
+        for part in self.split_message(message):
+            stream_stats = EncodingStats()
+            streams.append(b''.join(super().iter_encode(part, stats=stream_stats)))
+            num_symbols += stream_stats.num_symbols
+            num_bits += 8 * len(streams[-1])
+        header = (
+            bytes([self.num_streams, SPLIT_MODES.index(self.split)])
+            + b''.join(len(stream).to_bytes(4, byteorder='big') for stream in streams)
+        )
+        if stats is not None:
+            stats.num_symbols = num_symbols
+            stats.num_bits = 8 * len(header) + num_bits
+        return (
+            header
+            + b''.join(streams)
+        )
+
+    def iter_encode(self, message: Iterable[T], *, stats: EncodingStats = None) -> Iterator[bytes]:
+        # the stream sizes precede the streams
+        yield self.encode(message, stats=stats)
+
+    @staticmethod
+    def parse_streams(byte_stream: bytes) -> tuple[SplitMode, list[bytes]]:
+        num_streams = byte_stream[0]
+        split = SPLIT_MODES[byte_stream[1]]
+        offset = 2 + 4 * num_streams
+        streams = []
+        for i in range(num_streams):
+            size = int.from_bytes(byte_stream[2 + 4 * i:2 + 4 * (i + 1)], byteorder='big')
+            streams.append(byte_stream[offset:offset + size])
+            offset += size
+        return split, streams
+
+    def decode(self, byte_stream: bytes, max_length: int = None, *, executor: Executor = None) -> Iterable[T]:
+        """`max_length` is required to know how many symbols each stream contains.
+        The stream layout is read from `byte_stream`, not taken from the codec's attributes.
+        With an `executor`, each stream is decoded by a separate job.
+        """
+        assert max_length is not None, 'interleaved streams require the message length'
+        split, streams = self.parse_streams(byte_stream)
+        num_streams = len(streams)
+        stream_lengths = self.get_stream_lengths(max_length, num_streams, split)
+
+        if executor is not None:
+            futures = [
+                executor.submit(_decode_stream, self, stream, length)
+                for stream, length in zip(streams, stream_lengths)
+            ]
+            parts = [future.result() for future in futures]
+            if split == 'round-robin':
+                for i in range(max_length):
+                    yield parts[i % num_streams][i // num_streams]
+            else:
+                for part in parts:
+                    yield from part
+            return
+
+        if split == 'contiguous':
+            for stream, length in zip(streams, stream_lengths):
+                yield from super().decode(stream, length)
+            return
+
+        # decode one symbol of each stream in turn (the first streams may contain one more symbol)
+        decoders = [
+            TreeBasedCodec.decode(self, stream, length)
+            for stream, length in zip(streams, stream_lengths)
+        ]
+        for symbols in itertools.zip_longest(*decoders, fillvalue=_MISSING):
+            for symbol in symbols:
+                if symbol is not _MISSING:
+                    yield symbol
+
+    def decode_into(self, byte_stream: bytes, buffer, *, max_length: int = None) -> int:
+        """Decodes each stream directly into its part of `buffer`
+        (every `num_streams`-th position for round-robin streams).
+        `max_length` must be the message length and defaults to `len(buffer)`.
+        """
+        view = memoryview(buffer)
+        max_length = len(view) if max_length is None else max_length
+        assert max_length <= len(view), 'the buffer must hold the whole message'
+        split, streams = self.parse_streams(byte_stream)
+        num_streams = len(streams)
+        stream_lengths = self.get_stream_lengths(max_length, num_streams, split)
+        num_symbols = 0
+        for k, (stream, length) in enumerate(zip(streams, stream_lengths)):
+            if split == 'round-robin':
+                part = view[k:max_length:num_streams]
+            else:
+                part = view[num_symbols:num_symbols + length]
+            num_symbols += TreeBasedCodec.decode_into(self, stream, part, max_length=length)
+        return num_symbols
@@ -0,0 +1,383 @@
+import itertools
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from math import ceil
+from typing import NamedTuple, Optional
+
+from prefix_codes.codecs.base import BaseCodec, EncodingStats
+from prefix_codes.codecs.tree_based import group_codewords_by_length
+from prefix_codes.codes.canonical import (
+    create_canonical_table,
+    parse_codeword_lengths,
+    serialize_codeword_lengths,
+)
+from prefix_codes.codes.huffman import get_huffman_codeword_lengths
+from prefix_codes.utils import BitStringReader, as_buffer, write_bit_string
+
+MIN_MATCH = 3
+MAX_MATCH = 258
+WINDOW_SIZE = 2 ** 15
+BLOCK_SIZE = 2 ** 18
+"""Input bytes per block, so that the encoder's memory is bounded by the window and one block"""
+TOO_FAR = 4096
+"""Matches of MIN_MATCH bytes further away than this cost more than literals"""
+
+END_OF_BLOCK = 256
+# Deflate's (RFC 1951) buckets: a length/distance is coded as its bucket's symbol plus extra bits.
+LENGTH_BASES = [
+    3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15, 17, 19, 23, 27, 31,
+    35, 43, 51, 59, 67, 83, 99, 115, 131, 163, 195, 227, 258,
+]
+LENGTH_EXTRA_BITS = [0] * 8 + [1] * 4 + [2] * 4 + [3] * 4 + [4] * 4 + [5] * 4 + [0]
+DISTANCE_BASES = [
+    1, 2, 3, 4, 5, 7, 9, 13, 17, 25, 33, 49, 65, 97, 129, 193,
+    257, 385, 513, 769, 1025, 1537, 2049, 3073, 4097, 6145, 8193, 12289, 16385, 24577,
+]
+DISTANCE_EXTRA_BITS = [0, 0] + [i // 2 for i in range(28)]
+
+Token = tuple[int, int]
+"""(literal, 0) or (match length, distance)"""
+
+
+class Level(NamedTuple):
+    max_chain: int
+    """Maximum number of candidates searched per position"""
+    nice_length: int
+    """Searching stops once a match is this long"""
+    lazy: bool
+    """Emit a literal if the next position has a longer match"""
+    good_length: int
+    """Only a quarter of the chain is searched for a lazy match if the current match is this long"""
+
+
+# good_length as in zlib's configuration table
+LEVELS: dict[int, Level] = {
+    1: Level(max_chain=4, nice_length=8, lazy=False, good_length=4),
+    2: Level(max_chain=8, nice_length=16, lazy=False, good_length=4),
+    3: Level(max_chain=16, nice_length=32, lazy=False, good_length=4),
+    4: Level(max_chain=16, nice_length=32, lazy=True, good_length=4),
+    5: Level(max_chain=32, nice_length=64, lazy=True, good_length=8),
+    6: Level(max_chain=128, nice_length=128, lazy=True, good_length=8),
+    7: Level(max_chain=256, nice_length=MAX_MATCH, lazy=True, good_length=8),
+    8: Level(max_chain=1024, nice_length=MAX_MATCH, lazy=True, good_length=32),
+    9: Level(max_chain=4096, nice_length=MAX_MATCH, lazy=True, good_length=32),
+}
+
+
+class MatchFinder:
+    """Hash chains over the 3 byte prefixes of the positions in the sliding window.
+    `head` maps a prefix to its latest position, `prev` links each position to the
+    previous one with the same prefix.
+    `data` only holds the window and the current block (see `slide`).
+    """
+
+    data: bytes
+    level: Level
+    window_size: int
+    head: dict[bytes, int]
+    prev: list[int]
+    num_inserted: int
+    """Positions before this are in the index"""
+
+    def __init__(self, data: bytes, level: Level, window_size: int = WINDOW_SIZE):
+        self.data = data
+        self.level = level
+        self.window_size = window_size
+        self.head = {}
+        self.prev = [-1] * len(data)
+        self.num_inserted = 0
+
+    def slide(self, block: bytes) -> int:
+        """Appends `block` and drops the data before the window, rebasing the hash chains.
+        Returns the position of `block` in `data`.
+        """
+        shift = max(0, len(self.data) - self.window_size)
+        self.data = self.data[shift:] + block
+        self.head = {key: position - shift for key, position in self.head.items() if position >= shift}
+        self.prev = [
+            position - shift if position >= shift else -1
+            for position in itertools.islice(self.prev, shift, None)
+        ] + [-1] * len(block)
+        self.num_inserted = max(0, self.num_inserted - shift)
+        return len(self.data) - len(block)
+
+    def insert_until(self, end: int) -> None:
+        data = self.data
+        head = self.head
+        prev = self.prev
+        end = min(end, len(data) - MIN_MATCH + 1)
+        for position in range(self.num_inserted, end):
+            key = data[position:position + MIN_MATCH]
+            prev[position] = head.get(key, -1)
+            head[key] = position
+        self.num_inserted = max(self.num_inserted, end)
+
+    def find_longest_match(self, position: int, known_length: int = 0) -> tuple[int, int]:
+        """Returns (length, distance) of the longest match (length 0 if there is none).
+        If a good match of `known_length` bytes was found for the previous position,
+        only a quarter of the chain is searched.
+        """
+        data = self.data
+        max_length = min(MAX_MATCH, len(data) - position)
+        if max_length < MIN_MATCH:
+            return 0, 0
+        self.insert_until(position)
+
+        best_length = MIN_MATCH - 1
+        best_distance = 0
+        min_candidate = position - self.window_size
+        candidate = self.head.get(data[position:position + MIN_MATCH], -1)
+        max_chain = self.level.max_chain
+        if known_length >= self.level.good_length:
+            max_chain >>= 2
+        for _ in range(max_chain):
+            if candidate < 0 or candidate < min_candidate:
+                break
+            # the candidate can only be better if it matches the first `best_length` + 1 bytes
+            if (
+                    data[candidate + best_length] == data[position + best_length]
+                    and data[candidate:candidate + best_length] == data[position:position + best_length]
+            ):
+                length = get_match_length(data, candidate, position, max_length, best_length + 1)
+                if length > best_length:
+                    best_length = length
+                    best_distance = position - candidate
+                    if length >= self.level.nice_length or length == max_length:
+                        break
+            candidate = self.prev[candidate]
+
+        if best_distance == 0 or (best_length == MIN_MATCH and best_distance > TOO_FAR):
+            return 0, 0
+        return best_length, best_distance
+
+    def get_tokens(self, start: int = 0) -> list[Token]:
+        """Tokens for `data[start:]`, the data before `start` is only referenced."""
+        data = self.data
+        lazy = self.level.lazy
+        nice_length = self.level.nice_length
+        tokens: list[Token] = []
+        position = start
+        match: Optional[tuple[int, int]] = None
+        while position < len(data):
+            length, distance = match or self.find_longest_match(position)
+            match = None
+            if length and lazy and length < nice_length:
+                next_match = self.find_longest_match(position + 1, length)
+                if next_match[0] > length:
+                    tokens.append((data[position], 0))
+                    position += 1
+                    match = next_match
+                    continue
+            if length:
+                tokens.append((length, distance))
+                if length >= nice_length:
+                    # Like zlib, skip the positions inside long matches: in long runs,
+                    # they would fill the hash chains with candidates that all match.
+                    # The last position is inserted, so that runs keep matching at short distances.
+                    self.insert_until(position + 1)
+                    self.num_inserted = max(self.num_inserted, position + length - 1)
+                position += length
+            else:
+                tokens.append((data[position], 0))
+                position += 1
+        return tokens
+
+
+def get_match_length(data: bytes, a: int, b: int, max_length: int, known_length: int = 0) -> int:
+    """Length of the common prefix of `data[a:]` and `data[b:]` (up to `max_length`),
+    whose first `known_length` bytes are known to match.
+    Binary search on slice comparisons, which are a lot faster than comparing byte by byte.
+    """
+    low, high = known_length, max_length
+    while low < high:
+        middle = (low + high + 1) // 2
+        if data[a:a + middle] == data[b:b + middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def get_bucket(value: int, bases: list[int]) -> int:
+    return bisect_right(bases, value) - 1
+
+
+CodewordLookup = list[tuple[int, dict[str, int]]]
+
+
+def read_symbol(reader: BitStringReader, codeword_lookup: CodewordLookup) -> int:
+    for length, codewords in codeword_lookup:
+        symbol = codewords.get(reader.peek(length))
+        if symbol is not None:
+            reader.skip(length)
+            return symbol
+    raise AssertionError(f'invalid codeword at bit {reader.bit_position}')
+
+
+def get_codeword_lookup(codeword_lengths: dict[int, int]) -> CodewordLookup:
+    return group_codewords_by_length(create_canonical_table(codeword_lengths))
+
+
+def read_extra_bits(reader: BitStringReader, num_bits: int) -> int:
+    if not num_bits:
+        return 0
+    return reader.read_int(num_bits)
+
+
+class LZ77Codec(BaseCodec[int]):
+    """Deflate-like codec for byte messages.
+
+    The message is encoded in blocks of `BLOCK_SIZE` bytes.
+    A hash chain `MatchFinder` replaces repeats within the sliding window by (length, distance) tokens.
+    In each block, literals, match lengths (plus an end of block symbol) and distances are coded with
+    2 separate canonical Huffman codes whose codeword lengths precede the bits.
+    Each block ends with the end of block symbol and is padded to full bytes.
+    Lengths and distances are coded as buckets plus extra bits.
+    Higher levels search longer hash chains and match lazily for better ratios.
+    """
+
+    has_static_codec_data = True
+
+    level: int
+    window_size: int
+    block_size: int
+
+    def __init__(self, level: int = 6, window_size: int = WINDOW_SIZE, block_size: int = BLOCK_SIZE):
+        assert level in LEVELS, f'level must be one of {list(LEVELS)}'
+        assert 0 < window_size <= DISTANCE_BASES[-1] + 2 ** DISTANCE_EXTRA_BITS[-1] - 1, 'invalid window size'
+        assert block_size > 0, 'invalid block size'
+        self.level = level
+        self.window_size = window_size
+        self.block_size = block_size
+
+    @classmethod
+    def decode_byte_stream(cls, serialization: bytes) -> Iterable[int]:
+        codec_data, enc_message, message_length = cls.parse_byte_stream(serialization)
+        return cls().decode(enc_message, max_length=message_length)
+
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        # the tables precede the encoded tokens
+        return b''
+
+    def iter_blocks(self, message: Iterable[int]) -> Iterator[bytes]:
+        buffer = as_buffer(message)
+        if buffer is not None and buffer.format == 'B':
+            for start in range(0, len(buffer), self.block_size):
+                yield bytes(buffer[start:start + self.block_size])
+            return
+        # iterate instead of copying the memory of other buffers (e.g. 16 bit arrays)
+        symbols = iter(message)
+        while block := bytes(itertools.islice(symbols, self.block_size)):
+            yield block
+
+    def encode(self, message: Iterable[int], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
+        return b''.join(self.iter_encode(message, stats=stats))
+
+    def iter_encode(self, message: Iterable[int], *, stats: EncodingStats = None) -> Iterator[bytes]:
+        """Yields each block as soon as it is encoded. Matches may reach back into previous blocks."""
+        match_finder = MatchFinder(b'', LEVELS[self.level], self.window_size)
+        num_symbols = 0
+        num_bits = 0
+        for block in self.iter_blocks(message):
+            start = match_finder.slide(block)
+            encoded_block = self.encode_tokens(match_finder.get_tokens(start))
+            num_symbols += len(block)
+            num_bits += 8 * len(encoded_block)
+            yield encoded_block
+        if not num_symbols:
+            # the empty message is a single block with only the end of block symbol
+            encoded_block = self.encode_tokens([])
+            num_bits += 8 * len(encoded_block)
+            yield encoded_block
+        if stats is not None:
+            stats.num_symbols = num_symbols
+            stats.num_bits = num_bits
+
+    @staticmethod
+    def encode_tokens(tokens: list[Token]) -> bytes:
+        """The codeword lengths of both tables followed by the tokens' bits and the end of block symbol."""
+        # (symbol, extra bits, extra value) for literals/lengths and distances
+        literal_length_counts: Counter[int] = Counter([END_OF_BLOCK])
+        distance_counts: Counter[int] = Counter()
+        symbols: list[tuple[int, int, int, int, int, int]] = []
+        for value, distance in tokens:
+            if distance == 0:
+                literal_length_counts[value] += 1
+                symbols.append((value, 0, 0, -1, 0, 0))
+                continue
+            length_bucket = get_bucket(value, LENGTH_BASES)
+            distance_bucket = get_bucket(distance, DISTANCE_BASES)
+            literal_length_counts[END_OF_BLOCK + 1 + length_bucket] += 1
+            distance_counts[distance_bucket] += 1
+            symbols.append((
+                END_OF_BLOCK + 1 + length_bucket,
+                LENGTH_EXTRA_BITS[length_bucket],
+                value - LENGTH_BASES[length_bucket],
+                distance_bucket,
+                DISTANCE_EXTRA_BITS[distance_bucket],
+                distance - DISTANCE_BASES[distance_bucket],
+            ))
+
+        literal_length_lengths = get_huffman_codeword_lengths(literal_length_counts)
+        literal_length_table = create_canonical_table(literal_length_lengths)
+        distance_lengths = get_huffman_codeword_lengths(distance_counts) if distance_counts else {}
+        distance_table = create_canonical_table(distance_lengths)
+
+        bits: list[str] = []
+        for symbol, length_extra_bits, length_extra, distance_symbol, distance_extra_bits, distance_extra in symbols:
+            bits.append(literal_length_table[symbol])
+            if distance_symbol < 0:
+                continue
+            if length_extra_bits:
+                bits.append(format(length_extra, f'0{length_extra_bits}b'))
+            bits.append(distance_table[distance_symbol])
+            if distance_extra_bits:
+                bits.append(format(distance_extra, f'0{distance_extra_bits}b'))
+        bits.append(literal_length_table[END_OF_BLOCK])
+
+        return (
+            serialize_codeword_lengths(literal_length_lengths)
+            + serialize_codeword_lengths(distance_lengths)
+            + write_bit_string(''.join(bits))
+        )
+
+    def decode(self, byte_stream: bytes, *, max_length: int = None) -> Iterable[int]:
+        decoded = bytearray()
+        offset = 0
+        while offset < len(byte_stream) and (max_length is None or len(decoded) < max_length):
+            offset = self.decode_block(byte_stream, offset, decoded, max_length)
+        return decoded if max_length is None else decoded[:max_length]
+
+    @staticmethod
+    def decode_block(byte_stream: bytes, offset: int, decoded: bytearray, max_length: Optional[int]) -> int:
+        """Appends the symbols of the block at `offset` to `decoded`. Returns the offset of the next block."""
+        literal_length_lengths, offset = parse_codeword_lengths(byte_stream, offset)
+        distance_lengths, offset = parse_codeword_lengths(byte_stream, offset)
+        literal_length_lookup = get_codeword_lookup(literal_length_lengths)
+        distance_lookup = get_codeword_lookup(distance_lengths)
+        reader = BitStringReader(memoryview(byte_stream)[offset:])
+
+        while max_length is None or len(decoded) < max_length:
+            symbol = read_symbol(reader, literal_length_lookup)
+            if symbol < END_OF_BLOCK:
+                decoded.append(symbol)
+                continue
+            if symbol == END_OF_BLOCK:
+                break
+            length_bucket = symbol - END_OF_BLOCK - 1
+            length_extra = read_extra_bits(reader, LENGTH_EXTRA_BITS[length_bucket])
+            length = LENGTH_BASES[length_bucket] + length_extra
+            distance_bucket = read_symbol(reader, distance_lookup)
+            distance_extra = read_extra_bits(reader, DISTANCE_EXTRA_BITS[distance_bucket])
+            distance = DISTANCE_BASES[distance_bucket] + distance_extra
+            assert 0 < distance <= len(decoded), f'invalid distance {distance}'
+
+            start = len(decoded) - distance
+            if distance >= length:
+                decoded += decoded[start:start + length]
+            else:
+                # overlapping match: the last `distance` bytes repeat
+                pattern = decoded[start:]
+                decoded += (pattern * (length // distance + 1))[:length]
+        return offset + ceil(reader.bit_position / 8)
@@ -0,0 +1,49 @@
+"""Codecs by name. Codec modules are only imported when a codec is requested."""
+import importlib
+
+from prefix_codes.codecs.base import BaseCodec
+
+CODECS: dict[str, str] = {
+    'huffman': 'prefix_codes.codecs.tree_based:TreeBasedCodec',
+    'arithmetic': 'prefix_codes.codecs.arithmetic:ArithmeticCodec',
+    'auto': 'prefix_codes.codecs.auto:AutoCodec',
+    'adaptive-huffman': 'prefix_codes.codecs.adaptive_huffman:AdaptiveHuffmanCodec',
+    'windowed-huffman': 'prefix_codes.codecs.windowed_huffman:WindowedHuffmanCodec',
+    'interleaved-huffman': 'prefix_codes.codecs.interleaved:InterleavedTreeBasedCodec',
+    'bwt': 'prefix_codes.codecs.transform:TransformCodec',
+    'lz77': 'prefix_codes.codecs.lz77:LZ77Codec',
+}
+"""Maps codec names to '<module>:<class>'.
+`ShannonFanoEliasCodec` is not registered, since its floating point arithmetic only suffices for
+messages of a few bytes (use `ArithmeticCodec`).
+"""
+
+ALIASES: dict[str, str] = {
+    'h': 'huffman',
+    'ac': 'arithmetic',
+    'a': 'auto',
+    'ah': 'adaptive-huffman',
+    'wh': 'windowed-huffman',
+    'ih': 'interleaved-huffman',
+    'lz': 'lz77',
+}
+
+CODEC_NAMES: list[str] = [*CODECS, *ALIASES]
+
+
+def get_codec_class(name: str) -> type[BaseCodec]:
+    name = ALIASES.get(name, name)
+    try:
+        module_name, class_name = CODECS[name].split(':')
+    except KeyError:
+        raise ValueError(f'invalid code {name}') from None
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def get_codec_name(codec_class: type[BaseCodec]) -> str:
+    """Inverse of `get_codec_class`."""
+    path = f'{codec_class.__module__}:{codec_class.__qualname__}'
+    for name, codec_path in CODECS.items():
+        if codec_path == path:
+            return name
+    raise ValueError(f'{codec_class.__name__} is not registered')
@@ -1,14 +1,30 @@
 import pickle
+from collections import Counter
 from collections.abc import Iterable, Callable
 from itertools import takewhile
-from math import log2, ceil
+from math import ceil, inf, log2
 from typing import Generic, OrderedDict, Literal
 
-from prefix_codes.codecs.base import BaseCodec, T
+from prefix_codes.codecs.base import BaseCodec, EncodingStats, T
 
 
 ModelType = Literal['iid', 'markov', 'func']
 
+MAX_CODEWORD_BITS = 48
+"""Longer codewords cannot be decoded reliably, because the interval is represented with floats (53 bit mantissas)"""
+
+MODEL_TYPES: list[ModelType] = ['iid', 'markov', 'func']
+
+
+class TooLongMessageError(ValueError):
+    """Raised for messages whose codeword would exceed `MAX_CODEWORD_BITS`."""
+
+    def __init__(self, num_bits: float):
+        super().__init__(
+            f'the message needs {num_bits:.0f} bits, but Shannon-Fano-Elias coding with floats '
+            f'only supports {MAX_CODEWORD_BITS} bits (use arithmetic coding)'
+        )
+
 
 class ShannonFanoEliasCodec(BaseCodec, Generic[T]):
     """See 05-SpecialVLCodes.pdf"""
@@ -24,6 +40,19 @@ class ShannonFanoEliasCodec(BaseCodec, Generic[T]):
         self.model = model
         self.is_prefix_free = prefix_free
 
+    @classmethod
+    def from_message(cls, message: Iterable[T]):
+        """Raises `ValueError` if the message contains more information than `MAX_CODEWORD_BITS`."""
+        counter = Counter(message)
+        n = sum(counter.values())
+        num_bits = -sum(count * log2(count / n) for count in counter.values())
+        if num_bits > MAX_CODEWORD_BITS:
+            raise TooLongMessageError(num_bits)
+        return cls(OrderedDict(
+            (symbol, count / n)
+            for symbol, count in counter.items()
+        ))
+
     @classmethod
     def decode_byte_stream(cls, serialization: bytes) -> Iterable[T]:
         probabilities: OrderedDict[T, float]
@@ -35,31 +64,38 @@ class ShannonFanoEliasCodec(BaseCodec, Generic[T]):
         codec = cls(probabilities, model)
         return codec.decode(enc_message, num_bits=K, max_length=message_length)
 
-    def serialize_codec_data(self, message: Iterable[T]) -> bytes:
-        z, K = self.get_z_and_K(message)
-        return pickle.dumps([self.probabilities, self.model, K])
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        return pickle.dumps([self.probabilities, self.model, stats.num_bits])
 
-    def get_z_and_K(self, message: Iterable[T]) -> tuple[int, int]:
+    def get_z_and_K(self, message: Iterable[T], stats: EncodingStats = None) -> tuple[int, int]:
+        """Walks `message` once."""
         W = 1
         L = 0
-        for i, symbol in enumerate(message):
-            prev_symbols = message[:i]
+        prev_symbols: list[T] = []
+        for symbol in message:
+            assert symbol in self.probabilities, f'message contains invalid symbol {symbol}'
             p = self.p(symbol, prev_symbols)
             L += W * self.c(symbol, prev_symbols)
             W *= p
+            prev_symbols.append(symbol)
+            if W < 2 ** -MAX_CODEWORD_BITS:
+                raise TooLongMessageError(-log2(W) if W > 0 else inf)
 
         K = ceil(-log2(W))
         if self.is_prefix_free:
             K += 1
         z = ceil(L * 2 ** K)
 
+        if stats is not None:
+            stats.num_symbols = len(prev_symbols)
+            stats.num_bits = K
         return z, K
 
     def get_num_codeword_bits(self, message: Iterable[T]) -> int:
         z, K = self.get_z_and_K(message)
         return K
 
-    def encode(self, message: Iterable[T], *, max_length: int = None) -> bytes:
+    def encode(self, message: Iterable[T], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
         """See slide 34.
         W: interval width W_i, the current value in W_0, ..., W_N
         L: lower interval bound L_i, the current value in L_0, ..., L_N
@@ -67,9 +103,7 @@ class ShannonFanoEliasCodec(BaseCodec, Generic[T]):
         K: number of bits in codeword
         """
 
-        assert all(symbol in self.probabilities for symbol in message), 'message contains invalid symbols'
-
-        z, K = self.get_z_and_K(message)
+        z, K = self.get_z_and_K(message, stats)
         return z.to_bytes(ceil(K / 8), byteorder='big')
 
     def decode(self, byte_stream: bytes, *, max_length: int = None, num_bits: int = None) -> Iterable[T]:
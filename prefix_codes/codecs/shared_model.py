@@ -0,0 +1,71 @@
+import hashlib
+from collections import Counter
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, Generic, Optional
+
+from prefix_codes.binary_tree import BinaryTree
+from prefix_codes.codecs.base import EncodingStats, T
+from prefix_codes.codecs.tree_based import TreeBasedCodec
+from prefix_codes.codes.huffman import create_huffman_tree_from_frequencies
+
+DIGEST_BYTES = 16
+
+
+class SharedModelCodec(TreeBasedCodec, Generic[T]):
+    """Huffman codec whose tree is trained on a whole corpus and saved once in a model file.
+    Serializations only contain a digest of the model instead of the tree.
+    """
+
+    model_data: bytes
+    """Serialized table (see `TreeBasedCodec.serialize_codec_data`), i.e. the content of the model file"""
+
+    def __init__(self, tree: Optional[BinaryTree[T, Any]], table: dict[T, str]):
+        super().__init__(tree, table)
+        self.model_data = super().serialize_codec_data(EncodingStats())
+
+    @classmethod
+    def train(cls, messages: Iterable[Iterable[T]]) -> 'SharedModelCodec[T]':
+        counter: Counter[T] = Counter()
+        for message in messages:
+            counter.update(message)
+        return cls.from_counts(counter)
+
+    @classmethod
+    def from_counts(cls, counts: dict[T, int]) -> 'SharedModelCodec[T]':
+        n = sum(counts.values())
+        assert n > 0, 'cannot train on empty messages'
+        return cls.from_tree(create_huffman_tree_from_frequencies({
+            symbol: count / n
+            for symbol, count in counts.items()
+        }))
+
+    @classmethod
+    def load(cls, path: Path) -> 'SharedModelCodec[T]':
+        with open(path, 'rb') as file:
+            model_data = file.read()
+        return cls.from_table(cls.parse_table(model_data))
+
+    def save(self, path: Path) -> None:
+        with open(path, 'wb') as file:
+            file.write(self.model_data)
+
+    @property
+    def digest(self) -> bytes:
+        return hashlib.sha256(self.model_data).digest()[:DIGEST_BYTES]
+
+    @classmethod
+    def decode_byte_stream(cls, serialization: bytes) -> Iterable[T]:
+        raise ValueError(
+            'a shared model serialization can only be decoded with its model, '
+            'use SharedModelCodec.load(path).decode_serialization(...)'
+        )
+
+    def decode_serialization(self, serialization: bytes) -> Iterable[T]:
+        codec_data, enc_message, message_length = self.parse_byte_stream(serialization)
+        if codec_data != self.digest:
+            raise ValueError('the message was encoded with a different model')
+        return self.decode(enc_message, max_length=message_length)
+
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        return self.digest
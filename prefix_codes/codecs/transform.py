@@ -0,0 +1,170 @@
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from typing import Literal
+
+from prefix_codes.codecs.arithmetic import ArithmeticCodec
+from prefix_codes.codecs.base import BaseCodec, EncodingStats
+from prefix_codes.codecs.tree_based import TreeBasedCodec
+from prefix_codes.codes.canonical import (
+    create_canonical_table,
+    parse_codeword_lengths,
+    serialize_codeword_lengths,
+)
+from prefix_codes.codes.huffman import get_huffman_codeword_lengths
+from prefix_codes.transforms import (
+    burrows_wheeler_transform,
+    decode_zero_runs,
+    encode_zero_runs,
+    inverse_burrows_wheeler_transform,
+    inverse_move_to_front,
+    move_to_front,
+)
+from prefix_codes.utils import as_buffer
+
+EntropyCoder = Literal['huffman', 'arithmetic']
+
+ENTROPY_CODERS: list[EntropyCoder] = ['huffman', 'arithmetic']
+
+BLOCK_HEADER_BYTES = 16
+"""block length, primary index, number of transformed symbols, payload length (4 bytes each)"""
+
+
+class TransformCodec(BaseCodec[int]):
+    """Block-wise bzip2-like codec for byte messages.
+
+    Each block is Burrows-Wheeler transformed, move-to-front coded and its zero runs are
+    replaced by RUN_A/RUN_B digits (see `prefix_codes.transforms`).
+    The resulting symbols (0 to 256) are coded with a canonical Huffman code (`TreeBasedCodec`)
+    or an `ArithmeticCodec` whose table is stored per block.
+    Larger blocks compress better but the suffix array construction takes O(n log^2 n).
+    """
+
+    has_static_codec_data = True
+
+    block_size: int
+    entropy_coder: EntropyCoder
+    arithmetic_U: int
+
+    def __init__(self, block_size: int = 2 ** 16, entropy_coder: EntropyCoder = 'huffman', arithmetic_U: int = 16):
+        assert 0 < block_size < 2 ** 32, 'invalid block size'
+        assert entropy_coder in ENTROPY_CODERS, f'invalid entropy coder {entropy_coder}'
+        self.block_size = block_size
+        self.entropy_coder = entropy_coder
+        self.arithmetic_U = arithmetic_U
+
+    @classmethod
+    def decode_byte_stream(cls, serialization: bytes) -> Iterable[int]:
+        codec_data, enc_message, message_length = cls.parse_byte_stream(serialization)
+        codec = cls(entropy_coder=ENTROPY_CODERS[codec_data[0]])
+        return codec.decode(enc_message, max_length=message_length)
+
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        # the tables are part of each block
+        return bytes([ENTROPY_CODERS.index(self.entropy_coder)])
+
+    def encode(self, message: Iterable[int], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
+        return b''.join(self.iter_encode(message, stats=stats))
+
+    def iter_encode(self, message: Iterable[int], *, stats: EncodingStats = None) -> Iterator[bytes]:
+        """Yields the encoded blocks one by one."""
+        buffer = as_buffer(message)
+        if buffer is not None and buffer.format == 'B':
+            message = buffer
+        else:
+            message = bytes(iter(message))
+        num_bits = 0
+        for start in range(0, len(message), self.block_size):
+            encoded_block = self.encode_block(message[start:start + self.block_size])
+            num_bits += 8 * len(encoded_block)
+            yield encoded_block
+        if stats is not None:
+            stats.num_symbols = len(message)
+            stats.num_bits = num_bits
+
+    def decode(self, byte_stream: bytes, *, max_length: int = None) -> Iterable[int]:
+        num_symbols = 0
+        offset = 0
+        while offset < len(byte_stream):
+            if max_length is not None and num_symbols >= max_length:
+                break
+
+            block_length, primary_index, num_transformed_symbols, payload_length = (
+                int.from_bytes(byte_stream[i:i + 4], byteorder='big')
+                for i in range(offset, offset + BLOCK_HEADER_BYTES, 4)
+            )
+            offset += BLOCK_HEADER_BYTES
+            payload = byte_stream[offset:offset + payload_length]
+            offset += payload_length
+
+            yield from self.decode_block(payload, block_length, primary_index, num_transformed_symbols)
+            num_symbols += block_length
+
+    def encode_block(self, block: memoryview) -> bytes:
+        last_column, primary_index = burrows_wheeler_transform(block)
+        symbols = encode_zero_runs(move_to_front(last_column))
+        if self.entropy_coder == 'arithmetic':
+            payload = self.encode_arithmetic_symbols(symbols)
+        else:
+            payload = self.encode_huffman_symbols(symbols)
+        return (
+            len(block).to_bytes(4, byteorder='big')
+            + primary_index.to_bytes(4, byteorder='big')
+            + len(symbols).to_bytes(4, byteorder='big')
+            + len(payload).to_bytes(4, byteorder='big')
+            + payload
+        )
+
+    def decode_block(self, payload: bytes, block_length: int, primary_index: int,
+                     num_transformed_symbols: int) -> bytes:
+        if self.entropy_coder == 'arithmetic':
+            symbols = self.decode_arithmetic_symbols(payload, num_transformed_symbols)
+        else:
+            symbols = self.decode_huffman_symbols(payload, num_transformed_symbols)
+        block = inverse_burrows_wheeler_transform(inverse_move_to_front(decode_zero_runs(symbols)), primary_index)
+        assert len(block) == block_length, 'corrupted block'
+        return bytes(block)
+
+    @staticmethod
+    def encode_huffman_symbols(symbols: list[int]) -> bytes:
+        codeword_lengths = get_huffman_codeword_lengths(Counter(symbols))
+        codec = TreeBasedCodec.from_table(create_canonical_table(codeword_lengths))
+        return serialize_codeword_lengths(codeword_lengths) + codec.encode(symbols)
+
+    @staticmethod
+    def decode_huffman_symbols(payload: bytes, num_symbols: int) -> list[int]:
+        codeword_lengths, offset = parse_codeword_lengths(payload)
+        codec = TreeBasedCodec.from_table(create_canonical_table(codeword_lengths))
+        return list(codec.decode(payload[offset:], max_length=num_symbols))
+
+    def encode_arithmetic_symbols(self, symbols: list[int]) -> bytes:
+        V = ArithmeticCodec.get_lossless_V(len(symbols))
+        U = self.arithmetic_U
+        # sorted, since the decoder restores the counts (and so the interval order) by symbol
+        quantized_counts = dict(sorted(ArithmeticCodec.quantize_counts(Counter(symbols), V).items()))
+        codec = ArithmeticCodec.from_quantized_counts(quantized_counts, V=V, U=U)
+        num_count_bytes = V // 8 + 1  # a single symbol has count 2^V
+        num_counts = max(quantized_counts) + 1
+        return (
+            bytes([V, U])
+            + num_counts.to_bytes(2, byteorder='big')
+            + b''.join(
+                quantized_counts.get(symbol, 0).to_bytes(num_count_bytes, byteorder='big')
+                for symbol in range(num_counts)
+            )
+            + codec.encode(symbols)
+        )
+
+    @staticmethod
+    def decode_arithmetic_symbols(payload: bytes, num_symbols: int) -> list[int]:
+        V, U = payload[0], payload[1]
+        num_counts = int.from_bytes(payload[2:4], byteorder='big')
+        num_count_bytes = V // 8 + 1  # a single symbol has count 2^V
+        offset = 4
+        quantized_counts = {}
+        for symbol in range(num_counts):
+            count = int.from_bytes(payload[offset:offset + num_count_bytes], byteorder='big')
+            if count:
+                quantized_counts[symbol] = count
+            offset += num_count_bytes
+        codec = ArithmeticCodec.from_quantized_counts(quantized_counts, V=V, U=U)
+        return list(codec.decode(payload[offset:], max_length=num_symbols))
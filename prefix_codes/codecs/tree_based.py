@@ -1,11 +1,42 @@
-import pickle
-from collections.abc import Iterable
-from typing import Generic, Any
+import itertools
+from collections.abc import Iterable, Iterator
+from typing import Generic, Any, Optional
 
+from prefix_codes.alphabet import UNSIGNED_FORMATS, Alphabet
 from prefix_codes.binary_tree import BinaryTree
-from prefix_codes.codecs.base import T, BaseCodec
-from prefix_codes.typedefs import BitStream
-from prefix_codes.utils import write_bits, read_bits_from_string, read_bits, get_relative_frequencies
+from prefix_codes.codecs.base import T, BaseCodec, EncodingStats
+from prefix_codes.codes.huffman import create_huffman_tree
+from prefix_codes.utils import (
+    DECODE_CHUNK_BYTES,
+    REVERSED_BYTES,
+    as_buffer,
+    get_relative_frequencies,
+    write_bit_string,
+)
+
+ENCODE_CHUNK_SYMBOLS = 2 ** 16
+MAX_DECODE_TABLE_BITS = 12
+"""Codewords up to this length are decoded with a single lookup in the `decode_table`"""
+CODEC_DATA_VERSION = 0xC1
+"""First byte of the codec data. Older versions wrote a pickled tree (starting with 0x80) instead of the table."""
+
+
+def group_codewords_by_length(table: dict[T, str]) -> list[tuple[int, dict[str, T]]]:
+    """Groups the table by codeword length (ascending), mapping each codeword back to its key."""
+    codewords_by_length: dict[int, dict[str, T]] = {}
+    for key, codeword in table.items():
+        codewords_by_length.setdefault(len(codeword), {})[codeword] = key
+    return sorted(codewords_by_length.items(), key=lambda item: item[0])
+
+
+def find_long_codeword(long_codeword_lookup: list[tuple[int, dict[int, int]]], value: int,
+                       num_bits: int) -> tuple[int, int]:
+    """ID and length of the codeword that the last `num_bits` bits of `value` start with, `(-1, 0)` if there is none."""
+    for length, codewords in long_codeword_lookup:
+        symbol_id = codewords.get((value >> (num_bits - length)) & ((1 << length) - 1))
+        if symbol_id is not None:
+            return symbol_id, length
+    return -1, 0
 
 
 class TreeBasedCodec(BaseCodec, Generic[T]):
@@ -13,51 +44,243 @@ class TreeBasedCodec(BaseCodec, Generic[T]):
     to represent a codeword table.
     """
 
-    tree: BinaryTree[T, Any]
+    has_static_codec_data = True
+
+    _tree: Optional[BinaryTree[T, Any]]
     table: dict[T, str]
+    alphabet: Alphabet[T]
+    codewords: list[str]
+    """Codewords indexed by alphabet ID"""
+    flat_table: Optional[list[Optional[str]]]
+    """Codewords indexed by symbol value (if all symbols are 8 or 16 bit integers)"""
+    codeword_lookup: list[tuple[int, dict[str, int]]]
+    """IDs by codeword, grouped by codeword length (ascending)"""
+    _decode_table: Optional[tuple[int, list[tuple[int, int]]]]
 
-    def __init__(self, tree: BinaryTree[T, Any], table: dict[T, str]):
-        self.tree = tree
+    def __init__(self, tree: Optional[BinaryTree[T, Any]], table: dict[T, str]):
+        """`tree` may be `None` if it is only needed on demand (see `tree`)."""
+        self.set_table(table)
+        self._tree = tree
+
+    @property
+    def tree(self) -> BinaryTree[T, Any]:
+        """Built from the table on first access if the codec was created without one."""
+        if self._tree is None:
+            self._tree = BinaryTree.from_table(self.table)
+        return self._tree
+
+    def set_table(self, table: dict[T, str]) -> None:
+        """Replaces the codewords in place, e.g. when a stream switches to a new table."""
+        self._tree = None
         self.table = table
 
+        self.alphabet = Alphabet(table)
+        self.codewords = list(table.values())
+        self.flat_table = self.alphabet.get_flat_table(self.codewords)
+        self.codeword_lookup = group_codewords_by_length(dict(enumerate(self.codewords)))
+        self._decode_table = None
+
+    @property
+    def decode_table(self) -> tuple[int, list[tuple[int, int]]]:
+        """The number of bits `k` that the table is indexed by and, for each value of the next `k` bits,
+        the ID and length of the codeword they start with, or `(-1, 0)` for longer (or invalid) codewords.
+        Built on first access.
+        """
+        if self._decode_table is None:
+            table_bits = min(self.codeword_lookup[-1][0], MAX_DECODE_TABLE_BITS)
+            table = [(-1, 0)] * (1 << table_bits)
+            for length, codewords in self.codeword_lookup:
+                if length > table_bits:
+                    break
+                num_entries = 1 << (table_bits - length)
+                for codeword, symbol_id in codewords.items():
+                    start = int(codeword or '0', base=2) << (table_bits - length)
+                    table[start:start + num_entries] = [(symbol_id, length)] * num_entries
+            self._decode_table = table_bits, table
+        return self._decode_table
+
+    @classmethod
+    def from_tree(cls, tree: BinaryTree[T, Any], **kwargs):
+        return cls(tree, tree.get_table(), **kwargs)
+
     @classmethod
-    def from_tree(cls, tree: BinaryTree[T, Any]):
-        return cls(tree, tree.get_table())
+    def from_table(cls, table: dict[T, str], **kwargs):
+        return cls(None, table, **kwargs)
 
     @classmethod
-    def from_table(cls, table: dict[T, str]):
-        return cls(BinaryTree.from_table(table), table)
+    def from_message(cls, message: Iterable[T], **kwargs):
+        return cls.from_tree(create_huffman_tree(message), **kwargs)
 
     @classmethod
     def decode_byte_stream(cls, serialization: bytes) -> Iterable[T]:
         codec_data, enc_message, message_length = cls.parse_byte_stream(serialization)
-        codec = cls.from_tree(pickle.loads(codec_data))
+        codec = cls.from_table(cls.parse_table(codec_data))
         return codec.decode(enc_message, max_length=message_length)
 
-    def serialize_codec_data(self, message: Iterable[T]) -> bytes:
-        return pickle.dumps(self.tree)
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        """The format version (1 byte), the alphabet and each codeword's length (1 byte)
+        and bits (padded to full bytes).
+        """
+        assert all(len(codeword) < 256 for codeword in self.codewords), 'codewords must be shorter than 256 bits'
+        return bytes([CODEC_DATA_VERSION]) + self.alphabet.serialize() + b''.join(
+            bytes([len(codeword)])
+            + int(codeword or '0', base=2).to_bytes((len(codeword) + 7) // 8, byteorder='big')
+            for codeword in self.codewords
+        )
 
-    def encode(self, message: Iterable[T], *, max_length: int = None) -> bytes:
-        message_only_chars = set(message) - self.table.keys()
-        assert not message_only_chars, f'message contains invalid characters: {message_only_chars}'
-        bit_stream: BitStream = [
-            bit
-            for char in message
-            for bit in read_bits_from_string(self.table[char])
-        ]
-        return write_bits(bit_stream)
+    @staticmethod
+    def parse_table(codec_data: bytes) -> dict[T, str]:
+        if not codec_data or codec_data[0] != CODEC_DATA_VERSION:
+            raise ValueError(
+                f'unsupported Huffman header format {codec_data[:1].hex() or "(empty)"} '
+                f'(expected {CODEC_DATA_VERSION:02x}), the file was probably encoded by an older version'
+            )
+        alphabet, offset = Alphabet.parse(codec_data, 1)
+        table: dict[T, str] = {}
+        for symbol in alphabet.symbols:
+            length = codec_data[offset]
+            num_bytes = (length + 7) // 8
+            table[symbol] = format(
+                int.from_bytes(codec_data[offset + 1:offset + 1 + num_bytes], byteorder='big'),
+                f'0{length}b',
+            ) if length else ''  # a single symbol may have an empty codeword
+            offset += 1 + num_bytes
+        return table
+
+    def encode(self, message: Iterable[T], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
+        return b''.join(self.iter_encode(message, stats=stats))
+
+    def iter_encode(self, message: Iterable[T], *, stats: EncodingStats = None) -> Iterator[bytes]:
+        """Iterates `message` once, yielding the complete bytes of every `ENCODE_CHUNK_SYMBOLS` symbols.
+        The codewords are looked up by alphabet ID. Bytes-like messages are not copied and 8/16 bit buffers
+        look up their codewords by symbol value in the `flat_table` (skipping the IDs).
+        """
+        buffer = as_buffer(message)
+        flat_table = None
+        if buffer is not None:
+            if buffer.format in UNSIGNED_FORMATS:
+                flat_table = self.flat_table
+            chunks = (
+                buffer[start:start + ENCODE_CHUNK_SYMBOLS]
+                for start in range(0, len(buffer), ENCODE_CHUNK_SYMBOLS)
+            )
+        else:
+            symbols = iter(message)
+            chunks = iter(lambda: list(itertools.islice(symbols, ENCODE_CHUNK_SYMBOLS)), [])
+
+        num_symbols = 0
+        num_bits = 0
+        pending_bits = ''
+        codewords = self.codewords
+        to_ids = self.alphabet.to_ids
+        for chunk in chunks:
+            try:
+                if flat_table is not None:
+                    bit_string = ''.join([flat_table[symbol] for symbol in chunk])
+                else:
+                    bit_string = ''.join([codewords[symbol_id] for symbol_id in to_ids(chunk)])
+            except (AssertionError, IndexError, TypeError):
+                invalid_chars = set(chunk) - self.table.keys()
+                raise AssertionError(f'message contains invalid characters: {invalid_chars}') from None
+            num_symbols += len(chunk)
+            num_bits += len(bit_string)
+            bit_string = pending_bits + bit_string
+            num_complete_bits = len(bit_string) - len(bit_string) % 8
+            pending_bits = bit_string[num_complete_bits:]
+            if num_complete_bits:
+                yield write_bit_string(bit_string[:num_complete_bits])
+        if stats is not None:
+            stats.num_symbols = num_symbols
+            stats.num_bits = num_bits
+        if pending_bits:
+            yield write_bit_string(pending_bits)
 
     def decode(self, byte_stream: bytes, max_length: int = None) -> Iterable[T]:
-        node = self.tree
+        for symbols in self.iter_decode(byte_stream, max_length):
+            yield from symbols
+
+    def iter_decode(self, byte_stream: bytes, max_length: int = None) -> Iterator[list[T]]:
+        """Yields the symbols decoded from each chunk of `DECODE_CHUNK_BYTES` bytes of `byte_stream`.
+        The bits are shifted into an integer byte by byte. The codeword they start with is found
+        by its ID in the `decode_table` (or in the `codeword_lookup` if it is longer).
+        """
+        max_codeword_length = self.codeword_lookup[-1][0]
+        from_ids = self.alphabet.from_ids
+        if max_codeword_length == 0:
+            # a single symbol with an empty codeword: there are no bits, only the message length
+            assert max_length is not None, 'an empty codeword requires the message length'
+            yield from_ids([0] * max_length)
+            return
+
+        table_bits, decode_table = self.decode_table
+        table_mask = (1 << table_bits) - 1
+        long_codeword_lookup = self.get_long_codeword_lookup(table_bits)
+        view = memoryview(byte_stream).cast('B')
+        value = 0
+        num_bits = 0  # bits of `value` that are not decoded yet
+        num_chars = 0
+        for start in range(0, len(view), DECODE_CHUNK_BYTES):
+            ids: list[int] = []
+            append = ids.append
+            num_decoded_bits = 8 * start - num_bits
+            for byte in bytes(view[start:start + DECODE_CHUNK_BYTES]):
+                value = (value << 8) | REVERSED_BYTES[byte]
+                num_bits += 8
+                while num_bits >= max_codeword_length:
+                    symbol_id, length = decode_table[(value >> (num_bits - table_bits)) & table_mask]
+                    if not length:
+                        symbol_id, length = find_long_codeword(long_codeword_lookup, value, num_bits)
+                        if not length:
+                            if max_length is not None and num_chars + len(ids) >= max_length:
+                                yield from_ids(ids[:max_length - num_chars])
+                                return
+                            position = num_decoded_bits + sum(len(self.codewords[symbol_id]) for symbol_id in ids)
+                            raise AssertionError(f'invalid codeword at bit {position}')
+                    append(symbol_id)
+                    num_bits -= length
+                value &= (1 << num_bits) - 1
+            if max_length is not None and num_chars + len(ids) >= max_length:
+                yield from_ids(ids[:max_length - num_chars])
+                return
+            num_chars += len(ids)
+            yield from_ids(ids)
+
+        # the last bits are padded with zeros to the longest codeword length
+        ids = []
+        window_mask = (1 << max_codeword_length) - 1
+        value <<= max_codeword_length - num_bits
+        while num_bits > 0 and (max_length is None or num_chars + len(ids) < max_length):
+            symbol_id, length = decode_table[(value >> (max_codeword_length - table_bits)) & table_mask]
+            if not length:
+                symbol_id, length = find_long_codeword(long_codeword_lookup, value, max_codeword_length)
+            if not length or length > num_bits:
+                break  # the padding bits of the last byte
+            ids.append(symbol_id)
+            num_bits -= length
+            value = (value << length) & window_mask
+        yield from_ids(ids)
+
+    def get_long_codeword_lookup(self, table_bits: int) -> list[tuple[int, dict[int, int]]]:
+        """IDs by the integer value of the codewords longer than `table_bits`, grouped by length."""
+        return [
+            (length, {int(codeword, base=2): symbol_id for codeword, symbol_id in codewords.items()})
+            for length, codewords in self.codeword_lookup
+            if length > table_bits
+        ]
+
+    def decode_into(self, byte_stream: bytes, buffer, *, max_length: int = None) -> int:
+        """Like `decode` but writes the symbols directly into the writable `buffer`
+        (e.g. a `bytearray` or an `array.array`) without creating a generator per symbol.
+        Returns the number of decoded symbols.
+        """
+        view = memoryview(buffer)
+        max_length = len(view) if max_length is None else min(max_length, len(view))
         num_chars = 0
-        for bit in read_bits(byte_stream):
-            if max_length is not None and num_chars >= max_length:
-                break
-
-            terminal, node = node.consume_bit(bit)
-            if terminal is not None:
-                yield terminal
-                num_chars += 1
+        for symbols in self.iter_decode(byte_stream, max_length):
+            for i, symbol in enumerate(symbols, start=num_chars):
+                view[i] = symbol
+            num_chars += len(symbols)
+        return num_chars
 
     def get_average_codeword_length(self, message: Iterable[T]) -> float:
         table = self.table
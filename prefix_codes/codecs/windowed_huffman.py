@@ -0,0 +1,222 @@
+from collections import Counter, deque
+from collections.abc import Iterable, Iterator
+from math import inf
+from typing import Generic, Literal, Optional
+
+from prefix_codes.alphabet import Alphabet
+from prefix_codes.codecs.base import BaseCodec, EncodingStats, T
+from prefix_codes.codecs.tree_based import TreeBasedCodec
+from prefix_codes.codes.canonical import create_canonical_table
+from prefix_codes.codes.huffman import get_huffman_codeword_lengths_from_frequencies
+from prefix_codes.utils import get_entropy
+
+WindowMode = Literal['sliding', 'decay']
+
+
+def serialize_table(codeword_lengths: dict[T, int]) -> bytes:
+    """The alphabet followed by the codeword length (1 byte) of each symbol"""
+    return Alphabet(codeword_lengths).serialize() + bytes(codeword_lengths.values())
+
+
+def parse_table(table_data: bytes) -> dict[T, int]:
+    alphabet, offset = Alphabet.parse(table_data)
+    return dict(zip(alphabet.symbols, table_data[offset:]))
+
+
+class WindowedStatistics(Generic[T]):
+    """Symbol counts over the recent blocks of a stream, maintained incrementally.
+
+    'sliding': counts of the last `window_blocks` blocks.
+    'decay': all counts are multiplied by `decay` before adding a new block.
+    """
+
+    mode: WindowMode
+    window_blocks: int
+    decay: float
+    counts: dict[T, float]
+    blocks: deque[Counter[T]]
+
+    def __init__(self, mode: WindowMode = 'sliding', window_blocks: int = 8, decay: float = 0.5):
+        assert window_blocks > 0, 'window must contain at least 1 block'
+        assert 0 < decay <= 1, 'decay must be in (0, 1]'
+        self.mode = mode
+        self.window_blocks = window_blocks
+        self.decay = decay
+        self.counts = {}
+        self.blocks = deque()
+
+    def update(self, block_counts: Counter[T]) -> None:
+        counts = self.counts
+        match self.mode:
+            case 'sliding':
+                self.blocks.append(block_counts)
+                if len(self.blocks) > self.window_blocks:
+                    for symbol, count in self.blocks.popleft().items():
+                        counts[symbol] -= count
+                        if counts[symbol] <= 0:
+                            del counts[symbol]
+            case 'decay':
+                for symbol in counts:
+                    counts[symbol] *= self.decay
+            case _:
+                raise ValueError(f'invalid window mode {self.mode}')
+        for symbol, count in block_counts.items():
+            counts[symbol] = counts.get(symbol, 0) + count
+
+    @property
+    def relative_frequencies(self) -> dict[T, float]:
+        total = sum(self.counts.values())
+        return {
+            symbol: count / total
+            for symbol, count in self.counts.items()
+        }
+
+
+class WindowedHuffmanCodec(BaseCodec, Generic[T]):
+    """Block-wise Huffman codec for drifting streams.
+
+    A Huffman table is derived from the windowed statistics, but a new table is only
+    transmitted (as a table switch frame) if the bits it saves on the current block
+    exceed the size of its header. Otherwise the current table is reused.
+    Rebuilding is skipped entirely if even an ideal code could not save more than the new header.
+    A switch only recomputes the codeword lengths and updates the codec's table in place.
+    """
+
+    has_static_codec_data = True
+
+    block_size: int
+    statistics_options: dict
+
+    def __init__(self, block_size: int = 2 ** 14, mode: WindowMode = 'sliding',
+                 window_blocks: int = 8, decay: float = 0.5):
+        assert 0 < block_size < 2 ** 32, 'invalid block size'
+        self.block_size = block_size
+        self.statistics_options = dict(mode=mode, window_blocks=window_blocks, decay=decay)
+
+    def create_statistics(self) -> WindowedStatistics[T]:
+        return WindowedStatistics(**self.statistics_options)
+
+    @classmethod
+    def decode_byte_stream(cls, serialization: bytes) -> Iterable[T]:
+        codec_data, enc_message, message_length = cls.parse_byte_stream(serialization)
+        return cls().decode(enc_message, max_length=message_length)
+
+    def serialize_codec_data(self, stats: EncodingStats) -> bytes:
+        # the tables are part of the frames
+        return b''
+
+    def encode(self, message: Iterable[T], *, max_length: int = None, stats: EncodingStats = None) -> bytes:
+        return b''.join(self.iter_encode(message, stats=stats))
+
+    def iter_encode(self, message: Iterable[T], *, stats: EncodingStats = None) -> Iterator[bytes]:
+        """Yields each frame as soon as its block is complete."""
+        statistics = self.create_statistics()
+        codec: Optional[TreeBasedCodec[T]] = None
+        codeword_lengths: dict[T, int] = {}
+
+        num_symbols = 0
+        num_bits = 0
+        block: list[T] = []
+        for symbol in message:
+            num_symbols += 1
+            block.append(symbol)
+            if len(block) == self.block_size:
+                frame, codec, codeword_lengths = self.encode_block(block, statistics, codec, codeword_lengths)
+                num_bits += 8 * len(frame)
+                yield frame
+                block = []
+        if block:
+            frame, *_ = self.encode_block(block, statistics, codec, codeword_lengths)
+            num_bits += 8 * len(frame)
+            yield frame
+        if stats is not None:
+            stats.num_symbols = num_symbols
+            stats.num_bits = num_bits
+
+    @staticmethod
+    def encode_block(
+            block: list[T],
+            statistics: WindowedStatistics[T],
+            codec: Optional[TreeBasedCodec[T]],
+            codeword_lengths: dict[T, int],
+    ) -> tuple[bytes, TreeBasedCodec[T], dict[T, int]]:
+        """Returns the frame and the table state. A table switch updates `codec` in place."""
+        block_counts = Counter(block)
+        statistics.update(block_counts)
+
+        if codec is None or not block_counts.keys() <= codeword_lengths.keys():
+            current_bits = inf
+        else:
+            current_bits = sum(count * codeword_lengths[symbol] for symbol, count in block_counts.items())
+
+        table_header = b''
+        # The header of a new table only depends on its alphabet, i.e. the symbols in the window.
+        alphabet_data = Alphabet(statistics.counts).serialize()
+        new_header_bits = 8 * (4 + len(alphabet_data) + len(statistics.counts))
+        # A new table cannot beat the block's entropy, so only try if that would pay for its header.
+        block_entropy_bits = len(block) * get_entropy({
+            symbol: count / len(block)
+            for symbol, count in block_counts.items()
+        })
+        if current_bits - block_entropy_bits > new_header_bits:
+            new_codeword_lengths = get_huffman_codeword_lengths_from_frequencies(statistics.counts)
+            new_bits = sum(count * new_codeword_lengths[symbol] for symbol, count in block_counts.items())
+            if new_bits + new_header_bits < current_bits:
+                codeword_lengths = new_codeword_lengths
+                table = create_canonical_table(codeword_lengths)
+                if codec is None:
+                    codec = TreeBasedCodec.from_table(table)
+                else:
+                    codec.set_table(table)
+                table_data = alphabet_data + bytes(codeword_lengths.values())
+                table_header = len(table_data).to_bytes(4, byteorder='big') + table_data
+
+        payload = codec.encode(block)
+        return (
+            bytes([1 if table_header else 0])
+            + table_header
+            + len(block).to_bytes(4, byteorder='big')
+            + len(payload).to_bytes(4, byteorder='big')
+            + payload
+        ), codec, codeword_lengths
+
+    def decode(self, byte_stream: bytes, *, max_length: int = None) -> Iterable[T]:
+        codec: Optional[TreeBasedCodec[T]] = None
+        num_symbols = 0
+        offset = 0
+        while offset < len(byte_stream):
+            if max_length is not None and num_symbols >= max_length:
+                break
+
+            if byte_stream[offset]:
+                table_length = int.from_bytes(byte_stream[offset + 1:offset + 5], byteorder='big')
+                offset += 5
+                table = create_canonical_table(parse_table(byte_stream[offset:offset + table_length]))
+                if codec is None:
+                    codec = TreeBasedCodec.from_table(table)
+                else:
+                    codec.set_table(table)
+                offset += table_length
+            else:
+                offset += 1
+            assert codec is not None, 'first frame must contain a table'
+
+            block_length = int.from_bytes(byte_stream[offset:offset + 4], byteorder='big')
+            payload_length = int.from_bytes(byte_stream[offset + 4:offset + 8], byteorder='big')
+            offset += 8
+            yield from codec.decode(byte_stream[offset:offset + payload_length], max_length=block_length)
+            offset += payload_length
+            num_symbols += block_length
+
+    @staticmethod
+    def get_num_table_switches(byte_stream: bytes) -> int:
+        num_switches = 0
+        offset = 0
+        while offset < len(byte_stream):
+            if byte_stream[offset]:
+                num_switches += 1
+                offset += 5 + int.from_bytes(byte_stream[offset + 1:offset + 5], byteorder='big')
+            else:
+                offset += 1
+            offset += 8 + int.from_bytes(byte_stream[offset + 4:offset + 8], byteorder='big')
+        return num_switches
@@ -0,0 +1,45 @@
+from prefix_codes.codecs.base import T
+
+
+def create_canonical_table(codeword_lengths: dict[T, int]) -> dict[T, str]:
+    """Assigns consecutive codewords to the symbols ordered by codeword length.
+    The lengths must satisfy the Kraft inequality.
+    Symbols with equal lengths keep the order of `codeword_lengths`.
+    """
+    assert all(length > 0 for length in codeword_lengths.values()), 'codeword lengths must be positive'
+    assert sum(2 ** -length for length in codeword_lengths.values()) <= 1, (
+        'codeword lengths violate the Kraft inequality'
+    )
+
+    table: dict[T, str] = {}
+    codeword = 0
+    prev_length = 0
+    for symbol, length in sorted(codeword_lengths.items(), key=lambda item: item[1]):
+        codeword <<= length - prev_length
+        table[symbol] = format(codeword, f'0{length}b')
+        codeword += 1
+        prev_length = length
+    return table
+
+
+def serialize_codeword_lengths(codeword_lengths: dict[int, int]) -> bytes:
+    """Compact header for small, dense integer alphabets:
+    a length (0: unused) for each symbol up to the largest one.
+    """
+    num_lengths = max(codeword_lengths, default=-1) + 1
+    return (
+        num_lengths.to_bytes(2, byteorder='big')
+        + bytes(codeword_lengths.get(symbol, 0) for symbol in range(num_lengths))
+    )
+
+
+def parse_codeword_lengths(byte_stream: bytes, offset: int = 0) -> tuple[dict[int, int], int]:
+    """Inverse of `serialize_codeword_lengths`. Returns the lengths and the offset after them."""
+    num_lengths = int.from_bytes(byte_stream[offset:offset + 2], byteorder='big')
+    offset += 2
+    codeword_lengths = {
+        symbol: length
+        for symbol, length in enumerate(byte_stream[offset:offset + num_lengths])
+        if length
+    }
+    return codeword_lengths, offset + num_lengths
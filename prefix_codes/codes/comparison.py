@@ -0,0 +1,103 @@
+from collections import Counter
+from collections.abc import Iterable
+from math import ceil, log2
+from typing import NamedTuple
+
+from prefix_codes.codecs.arithmetic import ArithmeticCodec
+from prefix_codes.codecs.base import EncodingStats, T
+from prefix_codes.codecs.tree_based import TreeBasedCodec
+from prefix_codes.codes.canonical import create_canonical_table
+from prefix_codes.codes.huffman import (
+    create_huffman_tree_from_frequencies,
+    get_length_limited_codeword_lengths,
+    get_min_codeword_length_limit,
+)
+from prefix_codes.codes.shannon import get_shannon_codeword_lengths
+from prefix_codes.utils import get_entropy
+
+CODES = ['huffman', 'length-limited-huffman', 'shannon', 'arithmetic']
+"""Compared codes. Ties go to the code listed first (the cheaper one to decode)."""
+
+
+class CodeComparison(NamedTuple):
+    num_symbols: int
+    entropy: float
+    """Bits per symbol"""
+    payload_bits: dict[str, int]
+    """Bits of the encoded message for each code (estimated for the arithmetic code)"""
+    header_bits: dict[str, int]
+    """Bits of each code's table or model in a serialization (its codec data)"""
+
+    @property
+    def average_codeword_lengths(self) -> dict[str, float]:
+        """Bits per symbol for each code (without the header)"""
+        return {
+            code: num_bits / self.num_symbols
+            for code, num_bits in self.payload_bits.items()
+        }
+
+    def get_total_bits(self, code: str) -> int:
+        return self.payload_bits[code] + self.header_bits[code]
+
+    @property
+    def cheapest(self) -> str:
+        """The code with the fewest bits including its header"""
+        return min(CODES, key=lambda code: (self.get_total_bits(code), CODES.index(code)))
+
+    def get_redundancy(self, code: str) -> float:
+        return self.average_codeword_lengths[code] - self.entropy
+
+
+def compare_codes(message: Iterable[T], *, max_codeword_length: int = 15, arithmetic_U: int = 16) -> CodeComparison:
+    """Computes the payload and header sizes of the supported codes for `message`.
+
+    All sizes are computed from the symbol counts (without encoding the message),
+    so `message` is read once and may be a generator.
+    The length limit is raised if the alphabet does not fit into `max_codeword_length` bits.
+    The arithmetic code's payload is the information content of the message under the quantized
+    counts of the `ArithmeticCodec` that `ArithmeticCodec.from_counts` creates, plus U + V bits
+    for the termination (ignoring the small loss due to the finite precision of the interval width).
+    """
+    counter = Counter(message)
+    n = sum(counter.values())
+    assert n > 0, 'cannot compare codes for an empty message'
+    relative_frequencies = {
+        symbol: count / n
+        for symbol, count in counter.items()
+    }
+
+    huffman_table = create_huffman_tree_from_frequencies(relative_frequencies).get_table()
+    length_limit = max(max_codeword_length, get_min_codeword_length_limit(len(counter)))
+    prefix_code_lengths = {
+        'huffman': {
+            symbol: len(codeword)
+            for symbol, codeword in huffman_table.items()
+        },
+        'length-limited-huffman': get_length_limited_codeword_lengths(relative_frequencies, length_limit),
+        'shannon': get_shannon_codeword_lengths(relative_frequencies),
+    }
+    payload_bits = {
+        code: sum(count * codeword_lengths[symbol] for symbol, count in counter.items())
+        for code, codeword_lengths in prefix_code_lengths.items()
+    }
+    header_bits = {
+        code: 8 * len(
+            TreeBasedCodec.from_table(create_canonical_table(codeword_lengths)).serialize_codec_data(EncodingStats())
+        )
+        for code, codeword_lengths in prefix_code_lengths.items()
+    }
+
+    arithmetic_codec = ArithmeticCodec.from_counts(counter, U=arithmetic_U)
+    V = arithmetic_codec.V
+    payload_bits['arithmetic'] = ceil(sum(
+        count * (V - log2(arithmetic_codec.p_V[symbol]))
+        for symbol, count in counter.items()
+    )) + arithmetic_codec.U + V
+    header_bits['arithmetic'] = 8 * len(arithmetic_codec.serialize_codec_data(EncodingStats()))
+
+    return CodeComparison(
+        num_symbols=n,
+        entropy=get_entropy(relative_frequencies),
+        payload_bits=payload_bits,
+        header_bits=header_bits,
+    )
@@ -1,22 +1,116 @@
+import heapq
+import itertools
+from collections import Counter
 from collections.abc import Iterable
+from math import ceil, log2
 
 from prefix_codes.binary_tree import BinaryTree as Node, BinaryTree
 from prefix_codes.codecs.base import T
+from prefix_codes.codes.canonical import create_canonical_table
 from prefix_codes.utils import get_relative_frequencies
 
 
 def create_huffman_tree(message: Iterable[T]) -> BinaryTree[T, float]:
-    orphans: set[Node[T, float]] = {
-        Node(terminal=symbol, meta=relative_freq)
-        for symbol, relative_freq in get_relative_frequencies(message).items()
-    }
+    return create_huffman_tree_from_frequencies(get_relative_frequencies(message))
+
+
+def create_huffman_tree_from_frequencies(relative_frequencies: dict[T, float]) -> BinaryTree[T, float]:
+    # NOTE: The counter breaks ties so that nodes are never compared
+    #       (BinaryTree compares like a list, so e.g. all leaves are equal).
+    assert relative_frequencies, 'cannot create a Huffman tree without symbols'
+    counter = itertools.count()
+    orphans: list[tuple[float, int, Node[T, float]]] = [
+        (relative_freq, next(counter), Node(terminal=symbol, meta=relative_freq))
+        for symbol, relative_freq in relative_frequencies.items()
+    ]
+    heapq.heapify(orphans)
     while len(orphans) >= 2:
-        a, b = sorted(orphans, key=lambda item: item.meta)[:2]
-        orphans -= {a, b}
-        orphans |= {Node(children=[a, b], meta=a.meta + b.meta)}
-    tree = orphans.pop()
+        _, _, a = heapq.heappop(orphans)
+        _, _, b = heapq.heappop(orphans)
+        node = Node(children=[a, b], meta=a.meta + b.meta)
+        heapq.heappush(orphans, (node.meta, next(counter), node))
+    _, _, tree = orphans.pop()
+    if tree.terminal is not None:
+        # A single symbol still needs a codeword of 1 bit.
+        tree = Node(children=[tree, None], meta=tree.meta)
     tree.set_root(tree)
-    # TODO: assert full binary tree structure
-    # assert tree.is_full_binary, ''
-    # print('huffman tree', tree)
     return tree
+
+
+def get_huffman_codeword_lengths_from_frequencies(frequencies: dict[T, float]) -> dict[T, int]:
+    """Huffman codeword lengths without building a tree. The frequencies need not be normalized.
+    Merged nodes only remember their parent, a leaf's depth is its codeword length.
+    """
+    assert frequencies, 'cannot create a Huffman code without symbols'
+    if len(frequencies) == 1:
+        return {symbol: 1 for symbol in frequencies}
+    heap = [(frequency, node) for node, frequency in enumerate(frequencies.values())]
+    heapq.heapify(heap)
+    parents = [0] * (2 * len(frequencies) - 1)
+    for node in range(len(frequencies), len(parents)):
+        frequency_a, a = heapq.heappop(heap)
+        frequency_b, b = heapq.heappop(heap)
+        parents[a] = parents[b] = node
+        heapq.heappush(heap, (frequency_a + frequency_b, node))
+    # parents are created after their children, so the root is the last node
+    depths = [0] * len(parents)
+    for node in range(len(parents) - 2, -1, -1):
+        depths[node] = depths[parents[node]] + 1
+    return {
+        symbol: depths[node]
+        for node, symbol in enumerate(frequencies)
+    }
+
+
+def get_huffman_codeword_lengths(counts: dict[int, int]) -> dict[int, int]:
+    """Codeword lengths ordered by symbol, so that `create_canonical_table` gives the same code
+    for lengths that were serialized and parsed again.
+    """
+    total = sum(counts.values())
+    table = create_huffman_tree_from_frequencies({
+        symbol: count / total
+        for symbol, count in counts.items()
+    }).get_table()
+    return {
+        symbol: len(table[symbol])
+        for symbol in sorted(table)
+    }
+
+
+def get_length_limited_codeword_lengths(relative_frequencies: dict[T, float], max_length: int) -> dict[T, int]:
+    """Optimal codeword lengths not exceeding `max_length` (package-merge algorithm)."""
+    if len(relative_frequencies) == 1:
+        return {symbol: 1 for symbol in relative_frequencies}
+    assert 2 ** max_length >= len(relative_frequencies), (
+        f'{len(relative_frequencies)} symbols do not fit into codewords of {max_length} bits'
+    )
+
+    coins: list[tuple[float, tuple[T, ...]]] = sorted(
+        ((p, (symbol,)) for symbol, p in relative_frequencies.items()),
+        key=lambda item: item[0],
+    )
+    items = coins
+    for _ in range(max_length - 1):
+        packages = [
+            (a[0] + b[0], a[1] + b[1])
+            for a, b in zip(items[0::2], items[1::2])
+        ]
+        items = sorted(coins + packages, key=lambda item: item[0])
+
+    lengths: Counter[T] = Counter()
+    for _, symbols in items[:2 * len(relative_frequencies) - 2]:
+        lengths.update(symbols)
+    return dict(lengths)
+
+
+def create_length_limited_huffman_table(message: Iterable[T], max_length: int) -> dict[T, str]:
+    """Canonical Huffman code whose codewords are at most `max_length` bits long.
+    Use with `TreeBasedCodec.from_table`.
+    """
+    return create_canonical_table(
+        get_length_limited_codeword_lengths(get_relative_frequencies(message), max_length)
+    )
+
+
+def get_min_codeword_length_limit(num_symbols: int) -> int:
+    return max(1, ceil(log2(num_symbols)))
@@ -1,11 +1,25 @@
-# def shannon_code(codeword_table: dict[str, str], message: str) -> CodewordLenghts:
-#     n = len(message)
-#     counter = Counter(message)
-#     relative_frequencies = {
-#         terminal: count / n
-#         for terminal, count in counter.items()
-#     }
-#     return {
-#         terminal: ceil(-log2(relative_frequencies[terminal]))
-#         for terminal in counter
-#     }
+from collections.abc import Iterable
+from math import ceil, log2
+
+from prefix_codes.codecs.base import T
+from prefix_codes.codes.canonical import create_canonical_table
+from prefix_codes.utils import get_relative_frequencies
+
+
+def get_shannon_codeword_lengths(relative_frequencies: dict[T, float]) -> dict[T, int]:
+    """Codeword lengths ceil(-log2 p). A single symbol still needs 1 bit."""
+    return {
+        symbol: max(1, ceil(-log2(p)))
+        for symbol, p in relative_frequencies.items()
+    }
+
+
+def create_shannon_table(message: Iterable[T]) -> dict[T, str]:
+    """Canonical Shannon code for `message`.
+    Use with `TreeBasedCodec.from_table`.
+    """
+    return create_shannon_table_from_frequencies(get_relative_frequencies(message))
+
+
+def create_shannon_table_from_frequencies(relative_frequencies: dict[T, float]) -> dict[T, str]:
+    return create_canonical_table(get_shannon_codeword_lengths(relative_frequencies))
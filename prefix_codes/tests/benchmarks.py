@@ -0,0 +1,90 @@
+"""Run with `python3 -m prefix_codes.tests.benchmarks` (or `make bench`)."""
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from prefix_codes.codecs.registry import CODECS, get_codec_class
+
+ROOT = Path(__file__).parent.parent.parent
+
+BENCHMARKED_CODECS = [
+    'huffman', 'arithmetic', 'auto', 'adaptive-huffman', 'windowed-huffman', 'interleaved-huffman', 'bwt', 'lz77',
+]
+
+
+def measure_python(*args: str, repeat: int = 5) -> float:
+    """Best wall time of running a fresh interpreter with `args`."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_import_times() -> None:
+    baseline = measure_python('-c', 'pass')
+    print('import time (minus interpreter startup)')
+    for name, path in CODECS.items():
+        module_name = path.split(':')[0]
+        print(f'  {name:<22} {(measure_python("-c", f"import {module_name}") - baseline) * 1000:7.1f} ms')
+    print(f'  {"main.py --help":<22} {(measure_python("main.py", "--help") - baseline) * 1000:7.1f} ms')
+
+
+def create_message(n: int) -> bytes:
+    rng = random.Random(0)
+    words = [b'lorem', b'ipsum', b'dolor', b'sit', b'amet', b'\x00\x01', b'\xff']
+    message = bytearray()
+    while len(message) < n:
+        message += rng.choice(words) + b' '
+    return bytes(message[:n])
+
+
+def bench_codecs(n: int = 2 ** 15) -> None:
+    message = create_message(n)
+    print(f'throughput ({n} bytes)')
+    for name in BENCHMARKED_CODECS:
+        codec_class = get_codec_class(name)
+        start = time.perf_counter()
+        serialization = codec_class.from_message(message).serialize(message)
+        encode_time = time.perf_counter() - start
+        start = time.perf_counter()
+        decoded = bytes(codec_class.decode_byte_stream(serialization))
+        decode_time = time.perf_counter() - start
+        assert decoded == message, f'{name} did not reproduce the message'
+        print(
+            f'  {name:<22} ratio {n / len(serialization):5.2f}'
+            f'  encode {n / encode_time / 1e6:6.3f} MB/s'
+            f'  decode {n / decode_time / 1e6:6.3f} MB/s'
+        )
+
+
+def bench_lz77_levels(n: int = 2 ** 15) -> None:
+    from prefix_codes.codecs.lz77 import LEVELS, LZ77Codec
+
+    message = create_message(n)
+    print(f'lz77 levels ({n} bytes)')
+    for level in LEVELS:
+        start = time.perf_counter()
+        serialization = LZ77Codec(level).serialize(message)
+        encode_time = time.perf_counter() - start
+        print(f'  level {level}  ratio {n / len(serialization):5.2f}  encode {n / encode_time / 1e6:6.3f} MB/s')
+
+
+def bench_arithmetic_parameters(n: int = 2 ** 13) -> None:
+    from prefix_codes.codecs.arithmetic_parameters import select_parameters, sweep_parameters
+
+    results = sweep_parameters(create_message(n), sample_size=n)
+    print(f'arithmetic U/V ({n} bytes)')
+    for parameters in results:
+        print(f'  {parameters}')
+    print(f'  selected: {select_parameters(results)}')
+
+
+if __name__ == '__main__':
+    bench_import_times()
+    bench_codecs()
+    bench_lz77_levels()
+    bench_arithmetic_parameters()
@@ -1,12 +1,56 @@
+import array
+import asyncio
+import pickle
+import subprocess
+import sys
+import tempfile
 import unittest
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from math import ceil
+from pathlib import Path
 from pprint import pprint
+from random import Random
 
+from prefix_codes.alphabet import Alphabet, SymbolKind
+from prefix_codes.codecs.adaptive_huffman import AdaptiveHuffmanCodec
 from prefix_codes.codecs.arithmetic import ArithmeticCodec
+from prefix_codes.codecs.arithmetic_parameters import select_parameters, sweep_parameters
+from prefix_codes.codecs.asynchronous import AsyncCodec
+from prefix_codes.codecs.auto import AutoCodec, BlockMethod
+from prefix_codes.codecs.base import EncodingStats
+from prefix_codes.codecs.checksummed import ChecksumError, ChecksummedCodec
 from prefix_codes.codecs.shannon_fano_elias import ShannonFanoEliasCodec
-from prefix_codes.codecs.tree_based import TreeBasedCodec
-from prefix_codes.codes.huffman import create_huffman_tree
-from prefix_codes.utils import read_bits, get_relative_frequencies
+from prefix_codes.codecs.interleaved import InterleavedTreeBasedCodec
+from prefix_codes.codecs.lz77 import LEVELS, MAX_MATCH, LZ77Codec, MatchFinder
+from prefix_codes.codecs.registry import CODECS, get_codec_class
+from prefix_codes.codecs.shared_model import SharedModelCodec
+from prefix_codes.codecs.transform import TransformCodec
+from prefix_codes.codecs.tree_based import CODEC_DATA_VERSION, MAX_DECODE_TABLE_BITS, TreeBasedCodec
+from prefix_codes.codecs.windowed_huffman import WindowedHuffmanCodec
+from prefix_codes.codes.comparison import compare_codes
+from prefix_codes.codes.huffman import (
+    create_huffman_tree,
+    create_length_limited_huffman_table,
+    get_huffman_codeword_lengths_from_frequencies,
+)
+from prefix_codes.codes.shannon import create_shannon_table
+from prefix_codes.transforms import (
+    burrows_wheeler_transform,
+    decode_zero_runs,
+    encode_zero_runs,
+    inverse_burrows_wheeler_transform,
+    move_to_front,
+)
+from prefix_codes.utils import (
+    DECODE_CHUNK_BYTES,
+    BitStringReader,
+    get_relative_frequencies,
+    iter_bit_strings,
+    read_bit_string,
+    read_bits,
+    write_bit_string,
+)
 
 
 class TestCodecs(unittest.TestCase):
@@ -129,6 +173,50 @@ class TestCodecs(unittest.TestCase):
         # print(codec.average_codeword_length)
         self.assertAlmostEqual(codec.get_average_codeword_length(message), 7.634, places=3)
 
+    def test_shannon_codec_correctness(self):
+        message = b'aaaabbcd'
+        table = create_shannon_table(message)
+        self.assertEqual({symbol: len(codeword) for symbol, codeword in table.items()}, {
+            ord('a'): 1,
+            ord('b'): 2,
+            ord('c'): 3,
+            ord('d'): 3,
+        })
+        codec = TreeBasedCodec.from_table(table)
+        self.assertEqual(bytes(codec.decode(codec.encode(message), max_length=len(message))), message)
+
+    def test_length_limited_huffman_table(self):
+        message = b'a' * 64 + b'b' * 32 + b'c' * 16 + b'd' * 8 + b'e' * 4 + b'f' * 2 + b'g'
+        table = create_length_limited_huffman_table(message, max_length=4)
+        self.assertLessEqual(max(len(codeword) for codeword in table.values()), 4)
+        self.assertLessEqual(sum(2 ** -len(codeword) for codeword in table.values()), 1)
+        codec = TreeBasedCodec.from_table(table)
+        self.assertEqual(bytes(codec.decode(codec.encode(message), max_length=len(message))), message)
+
+    def test_compare_codes(self):
+        message = b'aaaabbcd'
+        comparison = compare_codes(message)
+        self.assertAlmostEqual(comparison.entropy, 1.75)
+        self.assertAlmostEqual(comparison.average_codeword_lengths['shannon'], 1.75)
+        self.assertAlmostEqual(comparison.average_codeword_lengths['huffman'], 1.75)
+        self.assertAlmostEqual(comparison.average_codeword_lengths['length-limited-huffman'], 1.75)
+        self.assertAlmostEqual(comparison.get_redundancy('huffman'), 0)
+        # the prefix codes tie, arithmetic coding pays for its termination and larger table
+        self.assertEqual(comparison.cheapest, 'huffman')
+        self.assertGreater(comparison.get_total_bits('arithmetic'), comparison.get_total_bits('huffman'))
+
+        message = b'a' * 99 + b'b'
+        comparison = compare_codes(iter(message))
+        self.assertEqual(comparison.cheapest, 'arithmetic')
+        # the arithmetic payload is estimated from the counts and bounds the encoded size
+        codec = ArithmeticCodec.from_message(message)
+        stats = EncodingStats()
+        codec.encode(message, stats=stats)
+        self.assertLessEqual(stats.num_bits, comparison.payload_bits['arithmetic'])
+        self.assertEqual(comparison.header_bits['arithmetic'], 8 * len(codec.serialize_codec_data(stats)))
+        codec = TreeBasedCodec.from_message(message)
+        self.assertEqual(comparison.header_bits['huffman'], 8 * len(codec.serialize_codec_data(EncodingStats())))
+
     def test_shannon_fano_elias_encode_decode(self):
         message = b'banana'
         probabilities = OrderedDict([
@@ -185,6 +273,42 @@ class TestCodecs(unittest.TestCase):
         self.assertEqual(codec.p_V, {A: 8, N: 5, B: 3})
         self.assertEqual(codec.c_V, {A: 0, N: 8, B: 13})
 
+    def test_arithmetic_quantization_min_frequency(self):
+        counts = {'a': 10_000, 'b': 1, 'c': 1}
+        quantized = ArithmeticCodec.quantize_counts(counts, V=4)
+        self.assertEqual(quantized, {'a': 14, 'b': 1, 'c': 1})
+        codec = ArithmeticCodec(OrderedDict((symbol, count / 10_002) for symbol, count in counts.items()), V=4, U=8)
+        self.assertEqual(sum(codec.p_V.values()), 2 ** 4)
+        message = 'a' * 50 + 'bc' + 'a' * 50
+        self.assertEqual(''.join(codec.decode(codec.encode(message), max_length=len(message))), message)
+        with self.assertRaises(AssertionError):
+            ArithmeticCodec.quantize_counts({symbol: 1 for symbol in range(17)}, V=4)
+        # no symbol's interval contains the codeword
+        with self.assertRaises(ValueError):
+            list(ArithmeticCodec(OrderedDict(a=0.5, b=0.5), V=4, U=4).decode(b'\xff', max_length=3))
+
+    def test_arithmetic_parameter_sweep(self):
+        message = b'abracadabra' * 400
+        results = sweep_parameters(message, Us=(4, 16), Vs=(3, 8, 16), sample_size=400)
+        self.assertEqual(
+            [(parameters.U, parameters.V) for parameters in results],
+            [(4, 3), (16, 3), (4, 8), (16, 8), (4, 16), (16, 16)],
+        )
+        by_parameters = {(parameters.U, parameters.V): parameters for parameters in results}
+        self.assertGreater(by_parameters[16, 3].quantization_redundancy, by_parameters[16, 8].quantization_redundancy)
+        # the counts take V // 8 + 1 bytes each
+        self.assertEqual(by_parameters[16, 8].header_bits - by_parameters[16, 3].header_bits, 8 * 5)
+        self.assertEqual(by_parameters[16, 16].header_bits - by_parameters[16, 8].header_bits, 8 * 5)
+        self.assertGreater(by_parameters[16, 8].redundancy, by_parameters[16, 8].header_bits / len(message))
+        self.assertLess(by_parameters[16, 8].redundancy, by_parameters[16, 16].redundancy)
+        # the smallest V (then U) that meets the target
+        selected = select_parameters(results, max_redundancy=0.06)
+        self.assertEqual((selected.U, selected.V), (16, 8))
+        selected = select_parameters(results, max_redundancy=0.1)
+        self.assertEqual((selected.U, selected.V), (4, 3))
+        # falls back to the least redundant parameters
+        self.assertEqual(select_parameters(results, max_redundancy=-1), by_parameters[16, 8])
+
     def test_arithmetic_encode(self):
         A = ord('A')
         N = ord('N')
@@ -236,6 +360,493 @@ class TestCodecs(unittest.TestCase):
             message
         )
 
+    def test_arithmetic_encode_decode_long_message(self):
+        message = b'abacabad' * 100
+        codec: ArithmeticCodec[int] = ArithmeticCodec(
+            OrderedDict(get_relative_frequencies(message)),
+            V=16,
+            U=16,
+        )
+        self.assertEqual(
+            bytes(ArithmeticCodec.decode_byte_stream(codec.serialize(message))),
+            message,
+        )
+
+    def test_huffman_single_symbol_and_zero_bytes(self):
+        for message in (b'aaaa', bytes(10), b'\x00\x01\x00\x02'):
+            codec = TreeBasedCodec.from_tree(create_huffman_tree(message))
+            self.assertEqual(bytes(TreeBasedCodec.decode_byte_stream(codec.serialize(message))), message)
+
+    def test_auto_block_methods(self):
+        text = (b'the quick brown fox jumps over the lazy dog. ' * 100)[:4096]
+        incompressible = bytes(range(256)) * 16
+        skewed = (b'a' * 63 + b'b') * 64
+        message = text + incompressible + skewed
+        codec = AutoCodec(block_size=4096)
+        encoded = codec.encode(message)
+
+        methods = []
+        offset = 0
+        while offset < len(encoded):
+            methods.append(BlockMethod(encoded[offset]))
+            offset += 9 + int.from_bytes(encoded[offset + 5:offset + 9], byteorder='big')
+        self.assertEqual(methods, [BlockMethod.HUFFMAN, BlockMethod.STORED, BlockMethod.ARITHMETIC])
+        self.assertEqual(bytes(AutoCodec.decode_byte_stream(codec.serialize(message))), message)
+
+        # a uniform block of 2^15 or more symbols has a quantized count of 2^16
+        message = b'a' * 40000
+        encoded = codec.encode_block(memoryview(message))
+        self.assertEqual(encoded[0], BlockMethod.ARITHMETIC)
+        self.assertEqual(bytes(AutoCodec.decode_byte_stream(AutoCodec().serialize(message))), message)
+        self.assertEqual(codec.encode_block(memoryview(b'')), bytes([BlockMethod.STORED]) + bytes(8))
+        self.assertEqual(bytes(AutoCodec.decode_byte_stream(codec.serialize(b''))), b'')
+
+    def test_adaptive_huffman_encode_decode(self):
+        message = b'abracadabra' * 20 + bytes(range(256))
+        for max_weight in (2 ** 16, 16):
+            codec = AdaptiveHuffmanCodec(max_weight=max_weight)
+            self.assertEqual(bytes(codec.decode(codec.encode(message), max_length=len(message))), message)
+            self.assertEqual(bytes(AdaptiveHuffmanCodec.decode_byte_stream(codec.serialize(message))), message)
+
+    def test_adaptive_huffman_sibling_property(self):
+        rng = Random(29)
+        message = (
+            bytes(rng.choice(b'aaaaaaaabbbbccd') for _ in range(3000))
+            + bytes(rng.randrange(256) for _ in range(3000))
+        )
+        for max_weight in (16, 100, 1000):
+            tree = AdaptiveHuffmanCodec(max_weight=max_weight).create_tree()
+            for symbol in message:
+                tree.update(symbol)
+                weights = tree.weight[tree.nyt:tree.root + 1]
+                self.assertEqual(weights, sorted(weights), f'max_weight {max_weight}')
+                for node in range(tree.nyt, tree.root + 1):
+                    if not tree.is_leaf(node):
+                        self.assertEqual(tree.right[node], tree.left[node] + 1)
+                        self.assertEqual(tree.weight[node], tree.weight[tree.left[node]] + tree.weight[tree.right[node]])
+
+    def test_adaptive_huffman_streaming(self):
+        message = b'to be or not to be, that is the question' * 10
+        codec = AdaptiveHuffmanCodec()
+        encoded_chunks = codec.iter_encode(iter(message))
+        decoded = codec.decode(
+            (byte for chunk in encoded_chunks for byte in chunk),
+            max_length=len(message),
+        )
+        self.assertEqual(bytes(decoded), message)
+
+    def test_windowed_huffman_table_switches(self):
+        first = (b'aaaabbc' * 300)[:2000]
+        second = (b'xyzzzzzzzq' * 300)[:2000]
+        message = first + second + first
+        for mode in ('sliding', 'decay'):
+            codec = WindowedHuffmanCodec(block_size=500, mode=mode, window_blocks=2)
+            encoded = codec.encode(message)
+            # 12 blocks but tables are only switched around the 3 segment boundaries
+            num_switches = WindowedHuffmanCodec.get_num_table_switches(encoded)
+            self.assertGreaterEqual(num_switches, 3)
+            self.assertLessEqual(num_switches, 6)
+            self.assertEqual(bytes(codec.decode(encoded, max_length=len(message))), message)
+            self.assertEqual(bytes(WindowedHuffmanCodec.decode_byte_stream(codec.serialize(message))), message)
+
+        # one frame per block, the serialization is streamed as well
+        frames = list(codec.iter_encode(iter(message)))
+        self.assertEqual(len(frames), 12)
+        self.assertEqual(b''.join(frames), encoded)
+        self.assertEqual(b''.join(codec.iter_serialize(message)), codec.serialize(message))
+        self.assertEqual(len(list(codec.iter_serialize(message))), 13)
+
+    def test_windowed_huffman_gate_uses_new_header_size(self):
+        # the first table codes 100 symbols with 6-7 bits, a 2 symbol table saves ~550 bits on the last block,
+        # which is less than the old table's header but more than the new one's
+        message = bytes(range(100)) * 2 + b'ab' * 50
+        codec = WindowedHuffmanCodec(block_size=100, window_blocks=1)
+        encoded = codec.encode(message)
+        self.assertEqual(WindowedHuffmanCodec.get_num_table_switches(encoded), 2)
+        self.assertEqual(bytes(codec.decode(encoded, max_length=len(message))), message)
+
+    def test_huffman_codeword_lengths_from_frequencies(self):
+        frequencies = {'a': 40, 'b': 30, 'c': 15, 'd': 10, 'e': 5}
+        lengths = get_huffman_codeword_lengths_from_frequencies(frequencies)
+        tree_lengths = {
+            symbol: len(codeword)
+            for symbol, codeword in create_huffman_tree(''.join(s * n for s, n in frequencies.items())).get_table().items()
+        }
+        self.assertEqual(
+            sum(frequencies[symbol] * length for symbol, length in lengths.items()),
+            sum(frequencies[symbol] * length for symbol, length in tree_lengths.items()),
+        )
+        self.assertEqual(get_huffman_codeword_lengths_from_frequencies({'a': 0.5}), {'a': 1})
+
+    def test_interleaved_huffman_encode_decode(self):
+        message = b'interleaved streams with one shared table' * 7
+        tree = create_huffman_tree(message)
+        for split in ('round-robin', 'contiguous'):
+            for num_streams in (1, 3, 4):
+                codec = InterleavedTreeBasedCodec.from_tree(tree, num_streams=num_streams, split=split)
+                encoded = codec.encode(message)
+                self.assertEqual(bytes(codec.decode(encoded, max_length=len(message))), message)
+                with ThreadPoolExecutor(max_workers=num_streams) as executor:
+                    decoded = codec.decode(encoded, max_length=len(message), executor=executor)
+                    self.assertEqual(bytes(decoded), message)
+                output = bytearray(len(message))
+                self.assertEqual(codec.decode_into(encoded, output), len(message))
+                self.assertEqual(output, message)
+                self.assertEqual(
+                    bytes(InterleavedTreeBasedCodec.decode_byte_stream(codec.serialize(message))),
+                    message,
+                )
+
+    def test_burrows_wheeler_transform(self):
+        last_column, primary_index = burrows_wheeler_transform(b'banana')
+        self.assertEqual(bytes(last_column), b'annbaa')
+        self.assertEqual(primary_index, 4)
+        for block in (b'', b'a', b'banana', b'abracadabra' * 13, bytes(range(256)) * 2):
+            self.assertEqual(bytes(inverse_burrows_wheeler_transform(*burrows_wheeler_transform(block))), block)
+        self.assertEqual(move_to_front(b'aaabbb'), [97, 0, 0, 98, 0, 0])
+        # runs of 1 to 4 zeros: RUN_A, RUN_B, RUN_A RUN_A, RUN_B RUN_A
+        self.assertEqual(encode_zero_runs([0, 5, 0, 0, 5, 0, 0, 0, 5, 0, 0, 0, 0]), [0, 6, 1, 6, 0, 0, 6, 1, 0])
+        for symbols in ([], [0] * 1000, [3, 0, 0, 1, 0, 2, 0, 0, 0, 0, 0, 0, 0]):
+            self.assertEqual(decode_zero_runs(encode_zero_runs(symbols)), symbols)
+
+    def test_transform_codec(self):
+        message = b''.join(
+            f'{level} request {i % 17} took {i % 5}ms\n'.encode()
+            for i, level in zip(range(600), ['INFO', 'INFO', 'WARN'] * 200)
+        )
+        huffman_size = len(TreeBasedCodec.from_message(message).serialize(message))
+        for entropy_coder in ('huffman', 'arithmetic'):
+            with self.subTest(entropy_coder=entropy_coder):
+                codec = TransformCodec(block_size=4096, entropy_coder=entropy_coder)
+                serialization = codec.serialize(message)
+                self.assertLess(len(serialization), huffman_size / 2)
+                self.assertEqual(bytes(TransformCodec.decode_byte_stream(serialization)), message)
+                self.assertEqual(bytes(TransformCodec.decode_byte_stream(codec.serialize(b'x'))), b'x')
+
+    def test_lz77_match_finder(self):
+        tokens = MatchFinder(b'abcabcabcX', LEVELS[6]).get_tokens()
+        # the match may overlap the current position
+        self.assertEqual(tokens, [(ord('a'), 0), (ord('b'), 0), (ord('c'), 0), (6, 3), (ord('X'), 0)])
+
+        # only the window and the current block are kept, matches reach back into the previous block
+        match_finder = MatchFinder(b'', LEVELS[9], window_size=100)
+        for block in (b'abc' * 100, b'abc' * 100):
+            start = match_finder.slide(block)
+            tokens = match_finder.get_tokens(start)
+            self.assertEqual(len(match_finder.data), start + len(block))
+            self.assertLessEqual(start, 100)
+            self.assertEqual(len(match_finder.prev), len(match_finder.data))
+        self.assertEqual(tokens[0], (MAX_MATCH, 3))
+
+    def test_lz77_encode_decode(self):
+        message = b''.join(
+            f'GET /api/items/{i % 23} 200 {i * 7 % 101}ms\n'.encode()
+            for i in range(500)
+        )
+        huffman_size = len(TreeBasedCodec.from_message(message).serialize(message))
+        sizes = {}
+        for level in LEVELS:
+            with self.subTest(level=level):
+                serialization = LZ77Codec(level).serialize(message)
+                sizes[level] = len(serialization)
+                self.assertEqual(bytes(LZ77Codec.decode_byte_stream(serialization)), message)
+        self.assertLess(sizes[9], sizes[1])
+        self.assertLess(sizes[1], huffman_size / 2)
+        for message in (b'', b'a', bytes(1000), bytes(range(256))):
+            self.assertEqual(bytes(LZ77Codec.decode_byte_stream(LZ77Codec().serialize(message))), message)
+
+    def test_lz77_blocks(self):
+        message = b''.join(f'{i % 37} blocks of {i % 11}\n'.encode() for i in range(500))
+        codec = LZ77Codec(level=9, window_size=2000, block_size=1000)
+        blocks = list(codec.iter_encode(iter(message)))
+        self.assertEqual(len(blocks), ceil(len(message) / 1000))
+        encoded = b''.join(blocks)
+        self.assertEqual(encoded, codec.encode(array.array('H', list(message))))
+        self.assertEqual(bytes(codec.decode(encoded)), message)
+        self.assertEqual(bytes(codec.decode(encoded, max_length=1500)), message[:1500])
+        self.assertEqual(len(list(codec.iter_serialize(message))), len(blocks) + 1)
+        self.assertEqual(bytes(LZ77Codec.decode_byte_stream(codec.serialize(message))), message)
+
+    def test_checksummed_blocks(self):
+        message = b''.join(f'block checksums {i}\n'.encode() for i in range(300))
+        for inner_codec in (TreeBasedCodec.from_message(message), LZ77Codec(level=1)):
+            codec = ChecksummedCodec(inner_codec, block_size=1000)
+            serialization = codec.serialize(message)
+            self.assertEqual(bytes(ChecksummedCodec.decode_byte_stream(serialization)), message)
+            self.assertEqual(bytes(ChecksummedCodec.decode_byte_stream(serialization, verify=False)), message)
+
+            # flip a bit in the last byte, i.e. in the payload of the last block
+            corrupted = serialization[:-1] + bytes([serialization[-1] ^ 1])
+            with self.assertRaises(ChecksumError):
+                bytes(ChecksummedCodec.decode_byte_stream(corrupted))
+            codec_data, enc_message, message_length = ChecksummedCodec.parse_byte_stream(corrupted)
+            blocks = list(ChecksummedCodec.from_codec_data(codec_data, message_length).decode_blocks(enc_message))
+            self.assertEqual([block.error is None for block in blocks], [True] * (len(blocks) - 1) + [False])
+            self.assertEqual(blocks[-1].error.block_index, len(blocks) - 1)
+            intact_symbols = b''.join(bytes(block.symbols) for block in blocks[:-1])
+            self.assertEqual(intact_symbols, message[:1000 * (len(blocks) - 1)])
+
+        # the Huffman tree is shared by all blocks and stored once with its own checksum
+        codec = ChecksummedCodec(TreeBasedCodec.from_message(message), block_size=1000)
+        serialization = codec.serialize(message)
+        corrupted = bytearray(serialization)
+        corrupted[50] ^= 1
+        with self.assertRaises(ChecksumError) as context:
+            bytes(ChecksummedCodec.decode_byte_stream(bytes(corrupted)))
+        self.assertIsNone(context.exception.block_index)
+
+        # the lengths in the meta bytes and the codec name are covered by the header checksum
+        for position in (5, 28, 31):
+            corrupted = bytearray(serialization)
+            corrupted[position] ^= 1
+            with self.assertRaises(ChecksumError) as context:
+                bytes(ChecksummedCodec.decode_byte_stream(bytes(corrupted)))
+            self.assertIsNone(context.exception.block_index)
+
+        # missing blocks are detected by comparing the decoded length with the message length
+        first_frame = next(codec.iter_encode(message))
+        codec_data, enc_message, message_length = ChecksummedCodec.parse_byte_stream(serialization)
+        self.assertTrue(enc_message.startswith(first_frame))
+        decoder = ChecksummedCodec.from_codec_data(codec_data, message_length)
+        blocks = list(decoder.decode_blocks(first_frame, max_length=message_length))
+        self.assertEqual([block.error is None for block in blocks], [True, False])
+        self.assertEqual(blocks[1].length, message_length - 1000)
+        with self.assertRaises(ChecksumError):
+            bytes(decoder.decode(first_frame, max_length=message_length))
+
+    def test_alphabet(self):
+        for symbols, kind in (
+            ([3, 0, 255], SymbolKind.UINT8),
+            ([1000, 7, 65535], SymbolKind.UINT16),
+            (['the', 'cat', 'ünïcode', ''], SymbolKind.STR),
+            ([b'GET', b'POST'], SymbolKind.BYTES),
+            ([(1, 2), -1, 2 ** 20], SymbolKind.PICKLE),
+        ):
+            alphabet = Alphabet(symbols)
+            serialization = alphabet.serialize()
+            self.assertEqual(serialization[0], kind)
+            parsed, offset = Alphabet.parse(serialization + b'rest')
+            self.assertEqual(parsed.symbols, symbols)
+            self.assertEqual(offset, len(serialization))
+            self.assertEqual(parsed.from_ids(parsed.to_ids(symbols[::-1])), symbols[::-1])
+
+        alphabet = Alphabet(array.array('H', [500, 3, 500]))
+        self.assertEqual(alphabet.symbols, [500, 3])
+        self.assertEqual(alphabet.to_ids(array.array('H', [3, 500, 3])), [1, 0, 1])
+        self.assertEqual(alphabet.get_flat_table(['a', 'b'])[3], 'b')
+        with self.assertRaises(AssertionError):
+            alphabet.to_ids(array.array('H', [4]))
+        with self.assertRaises(AssertionError):
+            Alphabet(['a']).to_ids(['b'])
+
+    def test_tree_based_codec_data_and_decode_table(self):
+        message = b'versioned header'
+        codec = TreeBasedCodec.from_message(message)
+        codec_data = codec.serialize_codec_data(EncodingStats())
+        self.assertEqual(codec_data[0], CODEC_DATA_VERSION)
+        self.assertEqual(TreeBasedCodec.parse_table(codec_data), codec.table)
+        # older versions pickled the tree
+        old_serialization = TreeBasedCodec.create_byte_stream(pickle.dumps(codec.tree), len(message), codec.encode(message))
+        with self.assertRaisesRegex(ValueError, 'older version'):
+            TreeBasedCodec.decode_byte_stream(old_serialization)
+
+        # a single symbol may have an empty codeword
+        codec = TreeBasedCodec.from_table({'a': ''})
+        self.assertEqual(list(TreeBasedCodec.decode_byte_stream(codec.serialize('aaa'))), ['a', 'a', 'a'])
+
+        # codewords longer than the decode table are looked up by length
+        table = {symbol: '1' * symbol + '0' for symbol in range(MAX_DECODE_TABLE_BITS + 8)}
+        table[MAX_DECODE_TABLE_BITS + 8] = '1' * (MAX_DECODE_TABLE_BITS + 8)
+        codec = TreeBasedCodec.from_table(table)
+        self.assertEqual(codec.decode_table[0], MAX_DECODE_TABLE_BITS)
+        message = bytes(range(MAX_DECODE_TABLE_BITS + 9)) * 300
+        self.assertEqual(bytes(codec.decode(codec.encode(message), len(message))), message)
+        with self.assertRaisesRegex(AssertionError, 'invalid codeword at bit 1'):
+            list(TreeBasedCodec.from_table({'a': '0', 'b': '10'}).decode(bytes([0b11111110])))
+
+    def test_16_bit_and_word_token_symbols(self):
+        samples = array.array('H', [(i * 37) % 1000 + 60_000 for i in range(2000)])
+        words = ('the quick brown fox jumps over the lazy dog ' * 20).split()
+        for codec_class in (TreeBasedCodec, ArithmeticCodec):
+            with self.subTest(codec_class=codec_class.__name__):
+                serialization = codec_class.from_message(samples).serialize(samples)
+                self.assertEqual(array.array('H', codec_class.decode_byte_stream(serialization)), samples)
+                serialization = codec_class.from_message(words).serialize(words)
+                self.assertEqual(list(codec_class.decode_byte_stream(serialization)), words)
+                # the header stores the 9 distinct words, not a pickled model
+                self.assertLess(len(serialization), 200)
+
+    def test_registry_round_trip(self):
+        self.assertIs(get_codec_class('h'), TreeBasedCodec)
+        with self.assertRaises(ValueError):
+            get_codec_class('invalid')
+
+        message = b'registry round trip \x00\xff' * 8
+        for name in CODECS:
+            codec_class = get_codec_class(name)
+            serialization = codec_class.from_message(message).serialize(message)
+            self.assertEqual(bytes(codec_class.decode_byte_stream(serialization)), message, name)
+
+        with self.assertRaises(ValueError):
+            ArithmeticCodec.from_message(b'')
+        # floats only suffice for a few bytes
+        with self.assertRaises(ValueError):
+            ShannonFanoEliasCodec.from_message(message)
+        with self.assertRaises(ValueError):
+            ShannonFanoEliasCodec.from_message(b'banana').encode(b'banana' * 10)
+
+    def test_cli_round_trip(self):
+        message = b''.join(f'line {i}: {i * i % 97} \x00\xff\n'.encode() for i in range(200))
+        self.assertGreaterEqual(len(message), 2 ** 10)
+        main_path = Path(__file__).parents[2] / 'main.py'
+        with tempfile.TemporaryDirectory() as directory:
+            for name in CODECS:
+                with self.subTest(name=name):
+                    path = Path(directory) / f'{name}.txt'
+                    path.write_bytes(message)
+                    for action, filename in (('encode', path), ('decode', path.with_suffix('.txt.enc'))):
+                        subprocess.run(
+                            [sys.executable, main_path, name, action, filename],
+                            check=True,
+                            capture_output=True,
+                        )
+                    self.assertEqual((Path(directory) / f'{name}_dec.txt').read_bytes(), message)
+
+    def test_shared_model(self):
+        corpus = [b'GET /index.html 200', b'GET /favicon.ico 404', b'POST /login 302']
+        codec = SharedModelCodec.train(corpus)
+        with tempfile.TemporaryDirectory() as directory:
+            model_path = Path(directory) / 'model.huff'
+            codec.save(model_path)
+            loaded = SharedModelCodec.load(model_path)
+        self.assertEqual(loaded.digest, codec.digest)
+        for message in corpus:
+            serialization = codec.serialize(message)
+            self.assertEqual(bytes(loaded.decode_serialization(serialization)), message)
+
+        other = SharedModelCodec.train([b'something else entirely'])
+        with self.assertRaises(ValueError):
+            other.decode_serialization(codec.serialize(corpus[0]))
+
+    def test_cli_shared_model(self):
+        main_path = Path(__file__).parents[2] / 'main.py'
+
+        def run(directory: Path, *args: str) -> subprocess.CompletedProcess:
+            return subprocess.run(
+                [sys.executable, main_path, 'huffman', *args, '--shared-model', directory / 'model.huff'],
+                cwd=directory,
+                capture_output=True,
+                text=True,
+            )
+
+        with tempfile.TemporaryDirectory() as directory:
+            directory = Path(directory)
+            (directory / 'logs').mkdir()
+            (directory / 'logs' / 'a.log').write_bytes(b'GET /index.html 200')
+            (directory / 'logs' / 'b.log').write_bytes(b'GET /favicon.ico 404')
+            (directory / 'logs' / 'empty.log').write_bytes(b'')
+            self.assertEqual(run(directory, 'encode', 'logs').returncode, 0)
+            model_data = (directory / 'model.huff').read_bytes()
+            self.assertEqual(run(directory, 'decode', 'logs').returncode, 0)
+            self.assertEqual((directory / 'logs' / 'a_dec.log').read_bytes(), b'GET /index.html 200')
+
+            # --force overwrites the outputs but keeps the model, earlier '_dec' outputs are skipped
+            (directory / 'logs' / 'c.log').write_bytes(b'POST /login 302')
+            result = run(directory, 'encode', 'logs', '--force')
+            self.assertEqual(result.returncode, 1)
+            self.assertIn('c.log contains bytes that are not in the shared model', result.stderr)
+            self.assertIn('3/4 files', result.stdout)
+            self.assertEqual((directory / 'model.huff').read_bytes(), model_data)
+
+            (directory / 'model.huff').rename(directory / 'logs' / 'model.huff')
+            result = run(directory / 'logs', 'encode', '.', '--force', '--retrain')
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertIn('4/4 files', result.stdout)
+            self.assertNotEqual((directory / 'logs' / 'model.huff').read_bytes(), model_data)
+
+            # without a shared model, the codec decides whether it can encode an empty file
+            for code, error in (('huffman', 'cannot create a Huffman tree without symbols'), ('lz77', '')):
+                result = subprocess.run(
+                    [sys.executable, main_path, code, 'encode', directory / 'logs' / 'empty.log', '--force'],
+                    capture_output=True,
+                    text=True,
+                )
+                self.assertEqual(result.returncode, 1 if error else 0, result.stderr)
+                self.assertIn(error, result.stderr)
+                self.assertIn(f'{0 if error else 1}/1 files', result.stdout)
+
+    def test_buffer_protocol_encode_and_decode_into(self):
+        message = b'buffers \x00 without copies \xff' * 10
+        codec = TreeBasedCodec.from_message(message)
+        encoded = codec.encode(message)
+        for buffer in (bytearray(message), memoryview(message), array.array('B', message)):
+            self.assertEqual(codec.encode(buffer), encoded)
+
+        output = bytearray(len(message))
+        self.assertEqual(codec.decode_into(encoded, output), len(message))
+        self.assertEqual(output, message)
+
+        auto_codec = AutoCodec()
+        output = array.array('B', bytes(len(message)))
+        self.assertEqual(auto_codec.decode_into(auto_codec.encode(memoryview(message)), output), len(message))
+        self.assertEqual(output.tobytes(), message)
+
+        symbols = array.array('H', [1000, 2000, 1000, 3000, 1000])
+        codec = TreeBasedCodec.from_message(symbols)
+        output = array.array('H', [0] * len(symbols))
+        codec.decode_into(codec.encode(symbols), output)
+        self.assertEqual(output, symbols)
+
+    def test_decode_in_chunks(self):
+        bits = '1101' * 100 + '001'
+        reader = BitStringReader(write_bit_string(bits), chunk_size=1)
+        self.assertEqual(reader.peek(12), bits[:12])
+        reader.skip(5)
+        self.assertEqual(reader.read_int(20), int(bits[5:25], base=2))
+        self.assertEqual(reader.bit_position, 25)
+        self.assertEqual(''.join(iter_bit_strings(write_bit_string(bits), chunk_size=3)), read_bit_string(write_bit_string(bits)))
+
+        # codewords span the chunks of the encoded message
+        random = Random(3)
+        message = bytes(random.choices(range(40), weights=range(1, 41), k=4 * DECODE_CHUNK_BYTES))
+        codec = TreeBasedCodec.from_message(message)
+        encoded = codec.encode(message)
+        self.assertGreater(len(encoded), 2 * DECODE_CHUNK_BYTES)
+        self.assertEqual(bytes(codec.decode(encoded, len(message))), message)
+        self.assertEqual(bytes(codec.decode(encoded, 10000)), message[:10000])
+        self.assertLessEqual(max(map(len, codec.iter_decode(encoded))), 8 * DECODE_CHUNK_BYTES)
+        output = bytearray(len(message))
+        self.assertEqual(codec.decode_into(encoded, output), len(message))
+        self.assertEqual(output, message)
+
+        codec = InterleavedTreeBasedCodec.from_message(message, num_streams=3, split='round-robin')
+        self.assertEqual(bytes(codec.decode(codec.encode(message), max_length=len(message) - 1)), message[:-1])
+        codec = LZ77Codec()
+        self.assertEqual(bytes(codec.decode(codec.encode(message))), message)
+
+    def test_serialize_generator_in_single_pass(self):
+        message = b'single pass over a generator' * 5
+        codecs = [
+            TreeBasedCodec.from_message(message),
+            ArithmeticCodec.from_message(message),
+            AutoCodec(),
+            AdaptiveHuffmanCodec(),
+            WindowedHuffmanCodec(block_size=16),
+            InterleavedTreeBasedCodec.from_message(message),
+        ]
+        for codec in codecs:
+            serialization = codec.serialize(byte for byte in message)
+            self.assertEqual(bytes(type(codec).decode_byte_stream(serialization)), message, type(codec).__name__)
+
+        message = b'banana'
+        codec = ShannonFanoEliasCodec(OrderedDict([
+            (ord('a'), 1 / 2),
+            (ord('n'), 1 / 3),
+            (ord('b'), 1 / 6),
+        ]))
+        serialization = codec.serialize(iter(message))
+        self.assertEqual(bytes(ShannonFanoEliasCodec.decode_byte_stream(serialization)), message)
+
     def test_arithmetic_with_audio_file(self):
         with open('prefix_codes/tests/Queen_sint8.raw', 'rb') as file:
             message = file.read()
@@ -250,3 +861,80 @@ class TestCodecs(unittest.TestCase):
         # pprint(relative_frequencies)
         compression_ratio = num_samples / len(codec.encode(message, max_length=num_samples))
         self.assertGreater(compression_ratio, 1)
+
+
+class TestAsyncCodec(unittest.IsolatedAsyncioTestCase):
+
+    async def test_encode_decode(self):
+        message = b'abracadabra' * 50
+        async_codec = AsyncCodec(TreeBasedCodec.from_tree(create_huffman_tree(message)), batch_size=64)
+        encoded = await async_codec.encode(message)
+        batches = [batch async for batch in async_codec.decode(encoded, max_length=len(message))]
+        self.assertTrue(all(len(batch) <= 64 for batch in batches))
+        self.assertEqual(bytes(symbol for batch in batches for symbol in batch), message)
+
+    async def test_serialize_from_async_chunks(self):
+        message = b'mississippi' * 20
+
+        async def chunks():
+            for i in range(0, len(message), 7):
+                yield message[i:i + 7]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            async_codec = AsyncCodec(
+                TreeBasedCodec.from_tree(create_huffman_tree(message)),
+                executor=executor,
+                max_concurrency=1,
+                chunk_size=5,
+            )
+            serialization = b''.join([chunk async for chunk in async_codec.serialize_stream(chunks())])
+            decoded = [batch async for batch in async_codec.decode_byte_stream(serialization)]
+        self.assertEqual(bytes(symbol for batch in decoded for symbol in batch), message)
+
+    async def test_encode_stream_in_parts(self):
+        message = bytes(range(256)) * 1024
+        for codec in (TreeBasedCodec.from_message(message), AutoCodec(block_size=2 ** 14)):
+            async_codec = AsyncCodec(codec, chunk_size=2 ** 12)
+            chunks = [chunk async for chunk in async_codec.encode_stream(message)]
+            self.assertGreater(len(chunks), 1)
+            self.assertTrue(all(len(chunk) <= 2 ** 12 for chunk in chunks))
+            self.assertEqual(b''.join(chunks), codec.encode(message))
+            chunks = [chunk async for chunk in async_codec.serialize_stream(message)]
+            self.assertEqual(b''.join(chunks), codec.serialize(message))
+
+    async def test_streams_with_process_pool(self):
+        message = b'process pool' * 100
+        codec = TreeBasedCodec.from_message(message)
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            async_codec = AsyncCodec(codec, executor=executor, chunk_size=64, batch_size=100)
+            chunks = [chunk async for chunk in async_codec.encode_stream(message)]
+            self.assertTrue(all(len(chunk) <= 64 for chunk in chunks))
+            self.assertEqual(b''.join(chunks), codec.encode(message))
+            chunks = [chunk async for chunk in async_codec.serialize_stream(message)]
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(b''.join(chunks), codec.serialize(message))
+            decoded = [batch async for batch in async_codec.decode_byte_stream(b''.join(chunks))]
+        self.assertEqual(bytes(symbol for batch in decoded for symbol in batch), message)
+
+    async def test_backpressure(self):
+        message = b'backpressure' * 100
+        async_codec = AsyncCodec(TreeBasedCodec.from_message(message), max_concurrency=1, batch_size=10)
+        was_read = asyncio.Event()
+
+        async def source():
+            was_read.set()
+            yield message
+
+        # the first job holds the only slot until its output is consumed
+        batches = async_codec.decode(await async_codec.encode(message), max_length=len(message))
+        await anext(batches)
+        task = asyncio.create_task(async_codec.encode(source()))
+        await asyncio.sleep(0.05)
+        self.assertFalse(was_read.is_set())
+        async for _ in batches:
+            pass
+        self.assertEqual(await task, await async_codec.encode(message))
+        self.assertTrue(was_read.is_set())
+
+        with self.assertRaises(ValueError):
+            await AsyncCodec(async_codec.codec, max_input_bytes=100).encode(source())
@@ -0,0 +1,148 @@
+"""Reversible transforms that make data more compressible for order-0 entropy coders
+(as in bzip2): Burrows-Wheeler transform, move-to-front and zero run-length encoding.
+"""
+from collections.abc import Iterable, Sequence
+
+RUN_A = 0
+RUN_B = 1
+"""Digits of zero run lengths (bijective base 2) in `encode_zero_runs`"""
+
+
+def get_suffix_array(s: Sequence[int]) -> list[int]:
+    """Suffix array by prefix doubling (O(n log^2 n) but every step is a builtin sort)."""
+    n = len(s)
+    if n == 0:
+        return []
+    rank = list(s)
+    suffix_array = sorted(range(n), key=rank.__getitem__)
+    k = 1
+    while True:
+        # sort by (rank of the first k symbols, rank of the next k symbols) combined into one int
+        factor = max(rank) + 2
+        key = [
+            rank[i] * factor + (rank[i + k] + 1 if i + k < n else 0)
+            for i in range(n)
+        ]
+        suffix_array.sort(key=key.__getitem__)
+
+        new_rank = [0] * n
+        r = 0
+        prev_key = key[suffix_array[0]]
+        for i in suffix_array:
+            if key[i] != prev_key:
+                r += 1
+                prev_key = key[i]
+            new_rank[i] = r
+        rank = new_rank
+        if r == n - 1:
+            return suffix_array
+        k *= 2
+
+
+def burrows_wheeler_transform(block: Sequence[int]) -> tuple[list[int], int]:
+    """Returns the last column of the sorted rotations of `block` + sentinel (without the sentinel)
+    and the row in which the sentinel was (primary index).
+    """
+    # shift symbols by 1 so that 0 is the unique smallest sentinel
+    suffix_array = get_suffix_array([symbol + 1 for symbol in block] + [0])
+    last_column = [block[i - 1] for i in suffix_array if i != 0]
+    return last_column, suffix_array.index(0)
+
+
+def inverse_burrows_wheeler_transform(last_column: Sequence[int], primary_index: int) -> list[int]:
+    n = len(last_column)
+    counts: dict[int, int] = {}
+    for symbol in last_column:
+        counts[symbol] = counts.get(symbol, 0) + 1
+    # first row of each symbol in the first column (row 0 is the sentinel)
+    first_rows: dict[int, int] = {}
+    row = 1
+    for symbol in sorted(counts):
+        first_rows[symbol] = row
+        row += counts[symbol]
+
+    # LF mapping: row of the rotation that starts with the last column's symbol
+    lf = [0] * (n + 1)
+    seen = dict.fromkeys(counts, 0)
+    for i in range(n + 1):
+        if i == primary_index:
+            continue  # sentinel maps to row 0
+        symbol = last_column[i if i < primary_index else i - 1]
+        lf[i] = first_rows[symbol] + seen[symbol]
+        seen[symbol] += 1
+
+    block = [0] * n
+    row = 0
+    for k in reversed(range(n)):
+        block[k] = last_column[row if row < primary_index else row - 1]
+        row = lf[row]
+    return block
+
+
+def move_to_front(symbols: Iterable[int], alphabet_size: int = 256) -> list[int]:
+    alphabet = list(range(alphabet_size))
+    indices = []
+    for symbol in symbols:
+        index = alphabet.index(symbol)
+        indices.append(index)
+        if index:
+            del alphabet[index]
+            alphabet.insert(0, symbol)
+    return indices
+
+
+def inverse_move_to_front(indices: Iterable[int], alphabet_size: int = 256) -> list[int]:
+    alphabet = list(range(alphabet_size))
+    symbols = []
+    for index in indices:
+        symbol = alphabet[index]
+        symbols.append(symbol)
+        if index:
+            del alphabet[index]
+            alphabet.insert(0, symbol)
+    return symbols
+
+
+def encode_zero_runs(symbols: Iterable[int]) -> list[int]:
+    """Replaces runs of zeros by their length written with the digits RUN_A (1) and RUN_B (2)
+    in bijective base 2 (least significant digit first). Other symbols are shifted by 1.
+    """
+    encoded = []
+    run_length = 0
+
+    def flush_run():
+        nonlocal run_length
+        while run_length > 0:
+            if run_length % 2:
+                encoded.append(RUN_A)
+                run_length = (run_length - 1) // 2
+            else:
+                encoded.append(RUN_B)
+                run_length = (run_length - 2) // 2
+
+    for symbol in symbols:
+        if symbol == 0:
+            run_length += 1
+        else:
+            flush_run()
+            encoded.append(symbol + 1)
+    flush_run()
+    return encoded
+
+
+def decode_zero_runs(encoded: Iterable[int]) -> list[int]:
+    symbols = []
+    run_length = 0
+    weight = 1
+    for symbol in encoded:
+        if symbol in (RUN_A, RUN_B):
+            run_length += weight * (symbol + 1)
+            weight *= 2
+            continue
+        if run_length:
+            symbols.extend([0] * run_length)
+            run_length = 0
+            weight = 1
+        symbols.append(symbol - 1)
+    symbols.extend([0] * run_length)
+    return symbols
@@ -1,7 +1,9 @@
+import array
 import itertools
 from collections import Counter
-from collections.abc import Hashable, Iterable
-from typing import TypeVar
+from collections.abc import Hashable, Iterable, Iterator
+from math import ceil, log2
+from typing import Optional, TypeVar
 
 from prefix_codes.typedefs import BitStream, Bit
 
@@ -48,6 +50,88 @@ def write_bits(bit_stream: BitStream) -> bytes:
     )
 
 
+def write_bit_string(bit_string: str) -> bytes:
+    """Same as `write_bits(read_bits_from_string(bit_string))` but without iterating bit by bit."""
+    if not bit_string:
+        return b''
+    return int(bit_string[::-1], base=2).to_bytes(ceil(len(bit_string) / 8), byteorder='little')
+
+
+def read_bit_string(byte_stream: bytes) -> str:
+    """Inverse of `write_bit_string` (including the padding bits)."""
+    num_bits = 8 * len(byte_stream)
+    if not num_bits:
+        return ''
+    return format(int.from_bytes(byte_stream, byteorder='little'), f'0{num_bits}b')[::-1]
+
+
+REVERSED_BYTES = [int(format(byte, '08b')[::-1], base=2) for byte in range(256)]
+"""Bytes with reversed bit order, i.e. the integer value of the bit string of each byte (see `read_bit_string`)"""
+DECODE_CHUNK_BYTES = 2 ** 12
+
+
+def iter_bit_strings(byte_stream: bytes, chunk_size: int = DECODE_CHUNK_BYTES) -> Iterator[str]:
+    """`read_bit_string` of consecutive chunks of `byte_stream`,
+    so that decoders never hold more than a chunk's bits as a string.
+    """
+    view = memoryview(byte_stream).cast('B')
+    for start in range(0, len(view), chunk_size):
+        yield read_bit_string(view[start:start + chunk_size])
+
+
+class BitStringReader:
+    """Reads the bit string of `byte_stream` (see `read_bit_string`) from left to right,
+    converting only a chunk of bytes at a time.
+    """
+
+    bits: str
+    """The current chunk's bits (plus the unread bits of the previous chunk)"""
+    position: int
+    """Next bit to read in `bits`"""
+    offset: int
+    """Number of bits before `bits`"""
+
+    def __init__(self, byte_stream: bytes, chunk_size: int = DECODE_CHUNK_BYTES):
+        self.bit_strings = iter_bit_strings(byte_stream, chunk_size)
+        self.bits = ''
+        self.position = 0
+        self.offset = 0
+
+    @property
+    def bit_position(self) -> int:
+        return self.offset + self.position
+
+    def peek(self, num_bits: int) -> str:
+        """The next `num_bits` bits (fewer at the end of the stream) without consuming them."""
+        if self.position + num_bits > len(self.bits):
+            self.offset += self.position
+            self.bits = self.bits[self.position:]
+            self.position = 0
+            for bit_string in self.bit_strings:
+                self.bits += bit_string
+                if len(self.bits) >= num_bits:
+                    break
+        return self.bits[self.position:self.position + num_bits]
+
+    def skip(self, num_bits: int) -> None:
+        self.position += num_bits
+
+    def read_int(self, num_bits: int) -> int:
+        value = int(self.peek(num_bits), base=2)
+        self.position += num_bits
+        return value
+
+
+BUFFER_TYPES = (bytes, bytearray, memoryview, array.array)
+
+
+def as_buffer(message: Iterable[T]) -> Optional[memoryview]:
+    """Returns a (zero-copy) memoryview for bytes-like messages, `None` for other iterables."""
+    if isinstance(message, BUFFER_TYPES):
+        return memoryview(message)
+    return None
+
+
 def get_relative_frequencies(message: Iterable[H]) -> dict[H, float]:
     counter = Counter(message)
     n = sum(counter.values())
@@ -55,3 +139,11 @@ def get_relative_frequencies(message: Iterable[H]) -> dict[H, float]:
         symbol: count / n
         for symbol, count in counter.items()
     }
+
+
+def get_entropy(relative_frequencies: dict[H, float]) -> float:
+    return -sum(
+        p * log2(p)
+        for p in relative_frequencies.values()
+        if p > 0
+    )